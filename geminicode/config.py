@@ -1,7 +1,84 @@
 # Configuration settings for GeminiCode CLI
 
-# Maximum number of messages to keep in context before summarization
-MAX_MESSAGES_IN_CONTEXT = 10
+# Tokens of conversation history sent with each request before older turns are compacted or summarized
+CONTEXT_TARGET_TOKENS = 100000
+
+# Tokens of the most recent turns that always stay verbatim
+CONTEXT_KEEP_RECENT_TOKENS = 20000
+
+# Characters kept from the start and from the end of an older tool result when it is compacted
+CONTEXT_COMPACT_KEEP_CHARS = 1000
+
+# Tool results larger than this are replaced by artifact stubs once their turn is over
+TOOL_RESULT_ELIDE_MIN_BYTES = 2000
+
+# Lines of a stored tool result kept in its stub
+TOOL_RESULT_STUB_HEAD_LINES = 10
+
+# Share of CONTEXT_TARGET_TOKENS at which old turns start being summarized in the background
+CONTEXT_SUMMARIZE_AT = 0.75
+
+# Summary checkpoints kept at the start of the history before they are merged into one
+CONTEXT_MAX_SUMMARIES = 4
+
+# Threads reading and decoding files while the project index is built
+INDEX_READ_WORKERS = 8
+
+# Rows handed to a single executemany when writing the project index
+INDEX_WRITE_BATCH_SIZE = 1000
+
+# Quiet period before a changed path is re-indexed by the file watcher
+WATCHER_DEBOUNCE_SECONDS = 0.25
+
+# Maximum paths applied to the project index in one watcher batch
+WATCHER_MAX_BATCH = 500
+
+# Seconds between scans when the watcher falls back to polling
+WATCHER_POLL_INTERVAL = 2.0
+
+# Bytes returned by read_file when the model does not pass max_bytes
+READ_FILE_DEFAULT_MAX_BYTES = 40000
+
+# Upper bound for read_file's max_bytes parameter
+READ_FILE_MAX_BYTES = 200000
+
+# Lines shown on each side of around_line when read_file gets no explicit range
+READ_FILE_AROUND_LINES = 20
+
+# Entries per list_files page when the model does not pass limit
+LIST_FILES_PAGE_SIZE = 200
+
+# Upper bound for list_files' limit parameter
+LIST_FILES_MAX_PAGE_SIZE = 1000
+
+# Defaults for expression_search with output_mode="lines"
+SEARCH_CONTEXT_LINES = 2
+SEARCH_MAX_MATCHES_PER_FILE = 10
+SEARCH_MAX_MATCHES = 100
+
+# Longer lines are cut in line-level search results, e.g. minified files
+SEARCH_MAX_LINE_LENGTH = 300
+
+# Seconds run_cli waits for a command when the model does not pass timeout_seconds
+RUN_CLI_TIMEOUT_SECONDS = 120
+
+# Upper bound for run_cli's timeout_seconds parameter
+RUN_CLI_MAX_TIMEOUT_SECONDS = 1800
+
+# Seconds between SIGTERM and SIGKILL when a command is stopped
+RUN_CLI_KILL_GRACE_SECONDS = 5
+
+# Bytes kept from the start and from the end of each run_cli output stream
+RUN_CLI_CAPTURE_HEAD_BYTES = 8000
+RUN_CLI_CAPTURE_TAIL_BYTES = 8000
+
+# Message history journal records written between two fsyncs
+HISTORY_FSYNC_BATCH = 16
+
+# The journal is compacted once it is HISTORY_COMPACT_RATIO times larger than the records of the
+# live messages, and at least HISTORY_COMPACT_MIN_BYTES
+HISTORY_COMPACT_RATIO = 2
+HISTORY_COMPACT_MIN_BYTES = 4 * 1024 * 1024
 
 # Log file path
 LOG_FILE_PATH = "geminicode.log"
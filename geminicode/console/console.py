@@ -3,9 +3,12 @@ from rich.panel import Panel
 from rich.syntax import Syntax
 from rich.table import Table
 from rich.json import JSON
+from rich.live import Live
+from rich.text import Text
 import json
 
 from rich.theme import Theme
+from geminicode.gemini.continuation import strip_markers
 
 # Create a custom theme
 custom_theme = Theme({
@@ -30,6 +33,10 @@ class ConsoleWrapper(Console):
     def __init__(self):
         super().__init__()
         self.json_format = False
+        # Panel being filled by a streamed response, replaced when it switches between thought and answer
+        self._live = None
+        self._live_text = ""
+        self._live_thinking = False
         
     def _get_json_output(self, data, type_name):
         if self.json_format:
@@ -66,9 +73,10 @@ class ConsoleWrapper(Console):
         json_output = self._get_json_output({"error": error}, "tool_error")
         if json_output:
             return json_output
+        # Plain Text, errors quote paths and outputs that Rich would read as markup
         self.print(
             Panel(
-                error,
+                Text(error),
                 title="[bold red]Tool Error[/bold red]",
                 border_style="red",
                 expand=False,
@@ -100,15 +108,55 @@ class ConsoleWrapper(Console):
                     )
                 )
 
-    def print_tool_result(self, result, thinking):
-        json_output = self._get_json_output({"result": result, "thinking": thinking}, "tool_result")
+    def _stream_panel(self):
+        # Plain Text, partial chunks may contain half a markup tag
+        text = strip_markers(self._live_text)
+        if self._live_thinking:
+            body = Text.assemble(("Thinking: ", "bold green"), text)
+            return Panel(body, title="[bold green]Gemini[/bold green]", border_style="green", expand=False)
+        return Panel(Text(text), title="[bold magenta]Gemini[/bold magenta]",
+                     border_style="magenta", expand=False)
+
+    def print_stream_chunk(self, text, thinking):
+        if not text:
+            return
+        json_output = self._get_json_output({"text": text, "thinking": thinking}, "gemini_stream_chunk")
         if json_output:
             return json_output
+        if self._live is not None and self._live_thinking != thinking:
+            self.end_stream()
+        if self._live is None:
+            self._live_text = ""
+            self._live_thinking = thinking
+            self._live = Live(self._stream_panel(), console=self, refresh_per_second=12,
+                              vertical_overflow="visible")
+            self._live.start()
+        self._live_text += text
+        self._live.update(self._stream_panel())
+
+    def end_stream(self):
+        """Leave the streamed panel on screen as is and stop refreshing it."""
+        if self._live is None:
+            return
+        self._live.update(self._stream_panel(), refresh=True)
+        self._live.stop()
+        self._live = None
+        if not self.is_terminal:
+            # Live leaves the cursor after the panel when output is piped
+            self.line()
+
+    def print_tool_result(self, result, thinking, name=None):
+        json_output = self._get_json_output({"result": result, "thinking": thinking, "function": name}, "tool_result")
+        if json_output:
+            return json_output
+        # Calls of one response run concurrently, the name tells their results apart
+        title = f"Tool Result: {name}" if name else "Tool Result"
+        # Plain Text, results are file contents and command output, not markup
         if thinking:
             self.print(
                 Panel(
-                    f"[bold green]Thinking:[/bold green] {result}",
-                    title="[bold green]Tool Result[/bold green]",
+                    Text.assemble(("Thinking: ", "bold green"), result),
+                    title=f"[bold green]{title}[/bold green]",
                     border_style="green",
                     expand=False,
                 )
@@ -116,8 +164,8 @@ class ConsoleWrapper(Console):
         else:
             self.print(
                 Panel(
-                    result,
-                    title="[bold green]Tool Result[/bold green]",
+                    Text(result),
+                    title=f"[bold green]{title}[/bold green]",
                     border_style="green",
                     expand=False,
                 )
@@ -156,11 +204,49 @@ class ConsoleWrapper(Console):
 
         self.print(table)
     
-    def print_token_count(self, token_count):
-        json_output = self._get_json_output({"token_count": token_count}, "token_count")
+    def print_cli_output(self, stream, text):
+        json_output = self._get_json_output({"stream": stream, "text": text}, "cli_output")
+        if json_output:
+            return json_output
+        style = "red" if stream == "stderr" else "dim"
+        self.print(text, style=style, end="", markup=False, highlight=False, soft_wrap=True)
+
+    def print_turn_cancelled(self):
+        json_output = self._get_json_output({"message": "Turn cancelled"}, "turn_cancelled")
+        if json_output:
+            return json_output
+        self.print("[warning]Turn cancelled.[/warning] Ask again or type 'exit' to quit.")
+
+    def print_turn_budget(self, budget):
+        json_output = self._get_json_output(budget.to_dict(), "turn_budget")
+        if json_output:
+            return json_output
+        self.print(f"[info]Turn budget:[/info] {budget}")
+
+    def print_continuation_stats(self, stats):
+        json_output = self._get_json_output(stats, "continuation_stats")
+        if json_output:
+            return json_output
+        if not stats["total"]:
+            return
+        rules = ", ".join(f"{rule} {count}" for rule, count in sorted(stats["by_rule"].items()))
+        self.print(f"[info]Continuation checks:[/info] {stats['local']} local, "
+                   f"{stats['remote']} remote ({rules})")
+
+    def print_token_count(self, token_count, context_tokens=None):
+        json_output = self._get_json_output({"token_count": token_count, "context_tokens": context_tokens}, "token_count")
+        if json_output:
+            return json_output
+        if context_tokens is None:
+            self.print(f"[info]Token count:[/info] {token_count}")
+        else:
+            self.print(f"[info]Token count:[/info] {token_count} [info]Context:[/info] ~{context_tokens} tokens")
+
+    def print_reindex_report(self, report):
+        json_output = self._get_json_output(report.to_dict(), "reindex_report")
         if json_output:
             return json_output
-        self.print(f"[info]Token count:[/info] {token_count}")
+        self.print(f"[info]Project index:[/info] {report}")
 
     def print_exit(self):
         json_output = self._get_json_output({"message": "Exiting GeminiCode CLI!"}, "exit")
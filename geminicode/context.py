@@ -4,4 +4,9 @@ class Context:
     """
     def __init__(self, cwd):
         self.cwd = cwd
+        # gitignore-style patterns that are never indexed, on top of the project's .gitignore files
         self.ignored_files = ['.git', '.gitignore', '.geminicode', 'system_prompts']
+        # Re-read every file on startup instead of skipping unchanged ones
+        self.full_reindex = False
+        # Keep the project index in sync with edits made outside of GeminiCode
+        self.watch_files = True
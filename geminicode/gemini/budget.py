@@ -0,0 +1,66 @@
+import time
+
+
+class TurnBudget:
+    """Token, wall-clock and iteration limits for one user turn.
+
+    An iteration is one model request. When a limit is reached the scheduler
+    makes one more request without tools so the model can wrap up, so a turn
+    can overshoot its token or time budget by that final answer.
+    """
+
+    def __init__(self, max_iterations, max_tokens, max_seconds):
+        self.max_iterations = max_iterations
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.iterations = 0
+        self.tokens = 0
+        self.start = time.monotonic()
+        self.exhausted_by = None
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def start_iteration(self):
+        self.iterations += 1
+
+    def add_usage(self, usage_metadata):
+        if usage_metadata and usage_metadata.total_token_count:
+            self.tokens += usage_metadata.total_token_count
+
+    def is_last_iteration(self):
+        return self.iterations >= self.max_iterations
+
+    def check(self):
+        """Name of the first exhausted limit, or None while there is budget left."""
+        if self.exhausted_by is None:
+            if self.iterations >= self.max_iterations - 1:
+                # Keep the last iteration for the final answer
+                self.exhausted_by = "iterations"
+            elif self.max_tokens and self.tokens >= self.max_tokens:
+                self.exhausted_by = "tokens"
+            elif self.max_seconds and self.elapsed >= self.max_seconds:
+                self.exhausted_by = "time"
+        return self.exhausted_by
+
+    def to_dict(self):
+        return {
+            "iterations": self.iterations,
+            "max_iterations": self.max_iterations,
+            "tokens": self.tokens,
+            "max_tokens": self.max_tokens,
+            "elapsed": round(self.elapsed, 2),
+            "max_seconds": self.max_seconds,
+            "exhausted_by": self.exhausted_by,
+        }
+
+    def __str__(self):
+        max_tokens = f"{self.max_tokens:,}" if self.max_tokens else "no limit"
+        max_seconds = f"{self.max_seconds}s" if self.max_seconds else "no limit"
+        text = (f"{self.iterations}/{self.max_iterations} iterations, "
+                f"{self.tokens:,}/{max_tokens} tokens, "
+                f"{self.elapsed:.1f}s/{max_seconds}")
+        if self.exhausted_by:
+            text += f" (stopped early: {self.exhausted_by} budget used up)"
+        return text
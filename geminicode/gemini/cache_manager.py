@@ -0,0 +1,139 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from google.genai import errors, types
+
+CACHE_NAME_PREFIX = "geminicode_"
+
+
+def cache_key(model: str, system_instruction: str, tools) -> str:
+    """Hash of everything a cached context is made of, sessions with the same key can share it."""
+    declarations = [tool.model_dump(mode="json", exclude_none=True) for tool in tools]
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(system_instruction.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(json.dumps(declarations, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def is_cache_missing(error: errors.ClientError) -> bool:
+    """Whether a request failed because its cached content expired or was deleted."""
+    return error.code in (403, 404)
+
+
+class CacheManager:
+    """Finds or creates the context cache for a model, system prompt and tool set.
+
+    Caches are named after their key, so a live cache left by an earlier or a
+    concurrent session with the same key is reused instead of recreated. The
+    TTL is only as long as `ttl_seconds` and gets extended while the session
+    is active, so an idle cache expires on its own. Only caches this manager
+    created are deleted on release; reused ones are left to expire. A cache
+    can still disappear under a session, deleted by the session that created
+    it, so requests recreate it and retry once.
+    """
+
+    def __init__(self, client, ttl_seconds: int, refresh_seconds: int):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = refresh_seconds
+        self.cache = None
+        self.key = None
+        self.owned = set()
+        self.last_time_cache_updated = None
+        self._create_config = None
+
+    @property
+    def name(self):
+        return self.cache.name if self.cache else None
+
+    def ensure(self, model: str, system_instruction: str, tools, tool_config: types.ToolConfig):
+        """Point the manager at the cache for these inputs, reusing a live one when there is one."""
+        key = cache_key(model, system_instruction, tools)
+        if self.cache is not None and key == self.key:
+            return self.cache
+        previous = self.cache
+
+        self.key = key
+        self._create_config = types.CreateCachedContentConfig(
+            display_name=CACHE_NAME_PREFIX + key[:32],
+            system_instruction=types.Content(parts=[types.Part(text=system_instruction)]),
+            tools=tools,
+            tool_config=tool_config,
+            ttl=f"{self.ttl_seconds}s",
+        )
+        reused = self._find_live(model)
+        if reused is not None:
+            # It may be close to expiring, the next touch extends it right away
+            self.cache = reused
+            self.last_time_cache_updated = None
+        else:
+            self.cache = self._create(model)
+            self.last_time_cache_updated = time.monotonic()
+
+        if previous is not None and previous.name != self.cache.name:
+            self._delete_owned(previous.name)
+        return self.cache
+
+    def _find_live(self, model: str):
+        # Keep a margin so a cache about to expire isn't picked up
+        min_expire_time = datetime.now(timezone.utc) + timedelta(seconds=min(60, self.ttl_seconds / 2))
+        for cache in self.client.caches.list():
+            if (cache.display_name == self._create_config.display_name
+                    and cache.model == model
+                    and cache.expire_time and cache.expire_time > min_expire_time):
+                return cache
+        return None
+
+    def _create(self, model: str):
+        cache = self.client.caches.create(model=model, config=self._create_config)
+        self.owned.add(cache.name)
+        return cache
+
+    async def touch(self):
+        """Extend the TTL after activity, at most once per refresh_seconds.
+
+        Recreates the cache if it is gone, e.g. deleted by the session that
+        created it.
+        """
+        if self.cache is None:
+            return
+        now = time.monotonic()
+        if self.last_time_cache_updated is not None and now - self.last_time_cache_updated < self.refresh_seconds:
+            return
+        try:
+            self.cache = await self.client.aio.caches.update(
+                name=self.cache.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+            )
+        except errors.ClientError as e:
+            if not is_cache_missing(e):
+                raise
+            await self.recreate()
+        self.last_time_cache_updated = now
+
+    async def recreate(self):
+        """Create the cache again after it expired or was deleted under this session."""
+        self.cache = await self.client.aio.caches.create(model=self.cache.model, config=self._create_config)
+        self.owned.add(self.cache.name)
+        self.last_time_cache_updated = time.monotonic()
+
+    def _delete_owned(self, name: str):
+        if name not in self.owned:
+            return
+        self.owned.discard(name)
+        try:
+            self.client.caches.delete(name=name)
+        except errors.ClientError as e:
+            if not is_cache_missing(e):
+                raise
+
+    def release(self):
+        """Delete the caches this manager created, reused ones expire on their own."""
+        for name in list(self.owned):
+            self._delete_owned(name)
+        self.cache = None
+        self.key = None
@@ -1,20 +1,33 @@
 import google.genai as genai
-from google.genai import types
+from google.genai import errors, types
 import os
 from geminicode.context import Context
 from geminicode.gemini.messages.message_handler import MessageHandler
+from geminicode.gemini.messages.summarizer import RollingSummarizer
 from geminicode.gemini.schemas import should_continue_schema
 from geminicode.work_tree.tree import WorkTree
 from geminicode.gemini.system_prompts import (
     system_prompt,
     should_continue_prompt,
-    summarize_previous_messages_prompt,
+    budget_exhausted_prompt,
+    summarize_segment_prompt,
+    merge_summaries_prompt,
 )
+import asyncio
+import inspect
 import json
+from typing import List, Optional
+from geminicode.config import CONTEXT_MAX_SUMMARIES, CONTEXT_SUMMARIZE_AT
 from geminicode.tools.tool_handler import ToolHandler
 from geminicode.console.console import ConsoleWrapper
 from geminicode.gemini_mcp.client import MCPClientHandler
 from geminicode.gemini.config import GeminiConfig
+from geminicode.gemini.budget import TurnBudget
+from geminicode.gemini.cache_manager import CacheManager, is_cache_missing
+from geminicode.work_tree.repo_map import RepoMap
+from geminicode.gemini.continuation import ContinuationPolicy, strip_markers
+from geminicode.gemini.streaming import ResponseAssembler
+from geminicode.gemini.tool_pipeline import ToolPipeline
 
 
 class AIClient:
@@ -22,44 +35,54 @@ class AIClient:
         self.cfg = cfg
         self.client = genai.Client(api_key=cfg.API_KEY)
         self.console = ConsoleWrapper()
-        self.last_time_cache_updated = None
+        self.cache_manager = CacheManager(self.client, cfg.cache_ttl_seconds, cfg.cache_refresh_seconds)
+        self.repo_map = RepoMap(cfg.work_tree, cfg.repo_map_max_tokens)
         self.message_handler = cfg.message_handler
-        self.max_iterations = cfg.max_ai_iterations
+        self.turn_budget = None
+        self.summarizer = RollingSummarizer(
+            self.summarize_contents, self.message_handler.context_window,
+            CONTEXT_SUMMARIZE_AT, CONTEXT_MAX_SUMMARIES,
+            summarize_segment_prompt, merge_summaries_prompt,
+        )
+        self.continuation_policy = ContinuationPolicy(
+            self.remote_should_continue if cfg.remote_continuation_check else None
+        )
         self.initialize()
 
     def initialize(self):
-        # Delete cache incase some were left over since you pay per hour.
-        self.delete_cache()
-
         self.model_name_for_caching = f"models/{self.cfg.model}"
 
         self.tools = [types.Tool(function_declarations=self.cfg.tool_handler.tools)]
 
-        system_instruction_as_content = types.Content(
-            parts=[
-                types.Part(
-                    text=system_prompt + "PROJECT FULL PATH: " + self.cfg.ctx.cwd
-                )
-            ]
-        )
+        self.repo_map.refresh()
+        self.update_cached_context()
 
-        self.cached_content_obj = self.client.caches.create(
-            model=self.model_name_for_caching,
-            config=types.CreateCachedContentConfig(
-                display_name="geminicode_cache",
-                system_instruction=system_instruction_as_content,
-                tools=self.tools + self.cfg.mcp_handler.tools,
-                tool_config=self.cfg.get_tools_config(
-                    types.FunctionCallingConfigMode.AUTO
-                ),
-                # TODO: MAKE CONFIGURABLE
-                ttl="3600s",
-            ),
+    def system_instruction(self) -> str:
+        text = system_prompt + "PROJECT FULL PATH: " + self.cfg.ctx.cwd
+        if self.repo_map.text:
+            text += "\n\n" + self.repo_map.text
+        return text
+
+    def update_cached_context(self):
+        # Reuses a live cache with the same prompt and tools, otherwise creates one
+        self.cache_manager.ensure(
+            self.model_name_for_caching,
+            self.system_instruction(),
+            self.tools + self.cfg.mcp_handler.tools,
+            self.cfg.get_tools_config(types.FunctionCallingConfigMode.AUTO),
         )
+
+    async def refresh_repo_map(self):
+        """Rebuild the repo map and the cache holding it when the project changed meaningfully."""
+        if await asyncio.to_thread(self.repo_map.refresh):
+            await asyncio.to_thread(self.update_cached_context)
+
+    @property
+    def generation_config_with_cache(self):
         # Cached config for ai. Includes Full system prompt, tools/MCP.
-        self.generation_config_with_cache = types.GenerateContentConfig(
+        return types.GenerateContentConfig(
             temperature=self.cfg.temperature,
-            cached_content=self.cached_content_obj.name,
+            cached_content=self.cache_manager.name,
             thinking_config=types.ThinkingConfig(
                 thinking_budget=self.cfg.thinking_budget,
                 include_thoughts=self.cfg.include_thoughts,
@@ -72,9 +95,6 @@ class AIClient:
             tool_config=self.cfg.get_tools_config(types.FunctionCallingConfigMode.NONE),
         )
 
-    def reset_max_iterations(self):
-        self.max_iterations = self.cfg.max_ai_iterations
-
     def generate_content_failed_check(self, response: types.GenerateContentResponse):
         if (
             not response.candidates
@@ -85,68 +105,177 @@ class AIClient:
             if response.candidates[0].finish_reason:
                 finished_reason = response.candidates[0].finish_reason
 
-            self.message_handler.add_text_message("user", f"Issue: {finished_reason}")
+            self.message_handler.add_injected_message(f"Issue: {finished_reason}")
             return True
         return False
 
     async def process_messages(self) -> str:
-        self.max_iterations -= 1
+        """Answer the last user message, one model request per iteration until the turn is done.
+
+        Every request counts against a TurnBudget. Once one of its limits is
+        used up, the model is asked for a final answer without tools.
+        """
+        budget = TurnBudget(self.cfg.max_ai_iterations, self.cfg.max_turn_tokens, self.cfg.max_turn_seconds)
+        self.turn_budget = budget
         try:
-            if self.max_iterations == 0:
+            await self.refresh_repo_map()
+            while True:
+                budget.start_iteration()
+                final = budget.exhausted_by is not None or budget.is_last_iteration()
+                if not await self.run_iteration(budget, final) or final:
+                    return
+                if budget.check():
+                    self.message_handler.add_injected_message(budget_exhausted_prompt(budget.exhausted_by))
+        except Exception as e:
+            import traceback
+
+            self.console.print_error(
+                e, "Error processing query", traceback.format_exc()
+            )
+            return f"Error processing query: {str(e)}"
+        finally:
+            self.console.print_turn_budget(budget)
+
+    async def run_iteration(self, budget: TurnBudget, final: bool) -> bool:
+        """One request and the function calls of its response. Returns whether the turn goes on."""
+        pipeline = None
+        try:
+            if final:
                 config_for_this_call = self.get_config_no_tools()
             else:
+                await self.cache_manager.touch()
                 config_for_this_call = self.generation_config_with_cache
 
-            response = self.client.models.generate_content(
-                model=self.cfg.model,
-                contents=self.message_handler.messages,
-                config=config_for_this_call,
-            )
+            if self.cfg.stream_responses and self.cfg.pipeline_tool_calls and not final:
+                pipeline = ToolPipeline(self)
+            try:
+                response = await self.request_response(config_for_this_call, pipeline)
+            except errors.ClientError as e:
+                if final or not is_cache_missing(e):
+                    raise
+                # Expired, or deleted by the session that created it
+                await self.cache_manager.recreate()
+                response = await self.request_response(self.generation_config_with_cache, pipeline)
 
-            token_count_cost = response.usage_metadata.total_token_count or 0
-            self.message_handler.accumulated_token_count += token_count_cost
+            budget.add_usage(response.usage_metadata)
+            self.message_handler.context_window.observe(self.message_handler.messages, response.usage_metadata)
+            if response.usage_metadata:
+                token_count_cost = response.usage_metadata.total_token_count or 0
+                self.message_handler.accumulated_token_count += token_count_cost
 
             if self.generate_content_failed_check(response):
-                return await self.process_messages()
+                return True
 
-            return await self.handle_response(response)
+            return await self.handle_response(response, rendered=self.cfg.stream_responses,
+                                              pipeline=pipeline, final=final)
 
-        except Exception as e:
-            import traceback
+        except (asyncio.CancelledError, Exception):
+            # Cancelled by the user or failed, stop the tools the response started as well
+            if pipeline is not None:
+                pipeline.cancel()
+            raise
 
-            self.console.print_error(
-                e, "Error processing query", traceback.format_exc()
-            )
-            return f"Error processing query: {str(e)}"
+    async def request_response(self, config: types.GenerateContentConfig,
+                               pipeline: Optional[ToolPipeline] = None) -> types.GenerateContentResponse:
+        if self.cfg.stream_responses:
+            return await self.stream_response(config, pipeline)
+        return await self.client.aio.models.generate_content(
+            model=self.cfg.model,
+            contents=self.message_handler.messages,
+            config=config,
+        )
 
-    async def handle_response(self, response: types.GenerateContentResponse):
+    async def stream_response(self, config: types.GenerateContentConfig,
+                              pipeline: Optional[ToolPipeline] = None) -> types.GenerateContentResponse:
+        """Render text and thoughts as they stream in, and return the assembled response.
+
+        With a pipeline, each function call is started as soon as its part arrives,
+        while the model is still generating the rest of the response.
+        """
+        assembler = ResponseAssembler()
+        try:
+            async for chunk in await self.client.aio.models.generate_content_stream(
+                model=self.cfg.model,
+                contents=self.message_handler.messages,
+                config=config,
+            ):
+                for part in assembler.add_chunk(chunk):
+                    if part.text:
+                        self.console.print_stream_chunk(part.text, bool(part.thought))
+                    if part.function_call and pipeline is not None:
+                        self.console.end_stream()
+                        self.console.print_tool_call(part.function_call.name, part.function_call.args)
+                        pipeline.submit(part.function_call)
+        finally:
+            self.console.end_stream()
+        return assembler.response()
+
+    async def handle_response(self, response: types.GenerateContentResponse, rendered: bool = False,
+                              pipeline: Optional[ToolPipeline] = None, final: bool = False) -> bool:
+        """Act on a complete response and return whether the turn goes on.
+
+        rendered means its text was already shown while streaming; a pipeline
+        means its function calls were already started from the stream. A final
+        response ends the turn without a continuation check.
+        """
         thinking = False
+        function_calls = []
+        answer = []
         for part in response.candidates[0].content.parts:
-            if part.thought:
-                thinking = True
-            else:
-                thinking = False
-                
+            thinking = bool(part.thought)
+
             if part.function_call:
-                await self.handle_part_function_call(part.function_call, thinking)
+                function_calls.append(part.function_call)
 
             if part.text:
-                await self.handle_part_text(part.text, thinking)
+                await self.handle_part_text(part.text, thinking, rendered)
+                if not thinking:
+                    answer.append(part.text)
 
-            if part.function_call or (not thinking and self.max_iterations > 0 and self.should_continue_check()):
-                return await self.process_messages()
+        # Every call of the response runs before the single follow-up request
+        if function_calls:
+            if pipeline is None:
+                pipeline = ToolPipeline(self)
+                for function_call in function_calls:
+                    self.console.print_tool_call(function_call.name, function_call.args)
+                    pipeline.submit(function_call)
+            await self.handle_function_calls(pipeline)
+            # Always goes on, asked anyway so the policy counts this path too
+            return await self.continuation_policy.should_continue(
+                "".join(answer), response.candidates[0].finish_reason, has_function_calls=True)
 
+        if not thinking and not final and await self.continuation_policy.should_continue(
+                "".join(answer), response.candidates[0].finish_reason):
+            self.message_handler.add_injected_message("Continue with next task")
+            return True
+        return False
+
+    async def handle_function_calls(self, pipeline: ToolPipeline):
+        """Wait for the function calls of one response and record them as one call/response pair.
+
+        Consecutive read-only and MCP calls run concurrently, sync handlers on
+        worker threads (see ToolPipeline for the ordering rules).
+        """
+        results = await pipeline.results()
+        self.message_handler.add_function_calls_with_results(pipeline.function_calls, results)
 
-    async def handle_part_function_call(self, function_call: types.FunctionCall, thinking: bool):
-        self.console.print_tool_call(function_call.name, function_call.args)
+    def is_concurrent_call(self, function_call: types.FunctionCall) -> bool:
+        return (function_call.name in self.cfg.tool_handler.concurrent_tools
+                or function_call.name in self.cfg.mcp_handler.tool_name_to_session)
+
+    async def execute_function_call(self, function_call: types.FunctionCall):
         handler = self.cfg.tool_handler.handlers.get(function_call.name)
+        args = dict(**(function_call.args or {}))
 
         if handler:
             try:
-                result = handler(self.cfg.work_tree, dict(**function_call.args))
+                if inspect.iscoroutinefunction(handler):
+                    result = await handler(self.cfg.work_tree, args)
+                else:
+                    result = await asyncio.to_thread(handler, self.cfg.work_tree, args)
                 self.console.print_tool_result(
                     str(result) if result is not None else ""
-                , thinking)
+                , False, function_call.name)
 
             except Exception as e:
                 error_msg = (
@@ -155,62 +284,71 @@ class AIClient:
                 self.console.print_tool_error(error_msg)
                 result = str(e)
         elif function_call.name in self.cfg.mcp_handler.tool_name_to_session:
-            result = await self.cfg.mcp_handler.call_tool(
-                function_call.name, dict(**function_call.args)
-            )
-            self.console.print_tool_result(
-                str(result) if result is not None else ""
-            , thinking)
+            try:
+                result = await self.cfg.mcp_handler.call_tool(function_call.name, args)
+                self.console.print_tool_result(
+                    str(result) if result is not None else ""
+                , False, function_call.name)
+            except Exception as e:
+                error_msg = (
+                    f"Error calling function {function_call.name}: {str(e)}"
+                )
+                self.console.print_tool_error(error_msg)
+                result = str(e)
         else:
             self.console.print_unknown_function_call(function_call.name)
             result = "Error: Unknown function call"
+        return result
 
-        self.message_handler.add_function_call_with_result(
-            function_call, result
-        )
-
-    async def handle_part_text(self, part: str, thinking: bool):
+    async def handle_part_text(self, part: str, thinking: bool, rendered: bool = False):
         if not thinking:
             self.message_handler.add_text_message("model", part)
-        self.console.print_gemini_message(part, thinking)
+        if not rendered:
+            self.console.print_gemini_message(strip_markers(part), thinking)
     
-    def should_continue_check(self):
+    async def remote_should_continue(self, last_ai_message: str) -> bool:
+        """Ask the model whether its last message ends the turn, for cases the local rules leave open."""
         config = self.get_config_no_tools()
         config.response_schema = should_continue_schema
         config.response_mime_type = "application/json"
-        messages = [self.message_handler.get_last_message()]
-        messages.append(
+        messages = [
             types.Content(
                 role="user",
                 parts=[
-                    types.Part(text=should_continue_prompt(messages[0].parts[0].text))
+                    types.Part(text=should_continue_prompt(last_ai_message))
                 ],
             )
-        )
-        response = self.client.models.generate_content(
+        ]
+        response = await self.client.aio.models.generate_content(
             model=self.cfg.model, contents=messages, config=config
         )
 
         data = json.loads(response.text)
-        result = data.get("should_continue", False)
-        if result:
-            self.message_handler.add_text_message("user", "Continue with next task")
-        return result
+        return data.get("should_continue", False)
 
     def delete_cache(self):
-        for cache in self.client.caches.list():
-            self.client.caches.delete(name=cache.name)
+        """Delete the caches this session created, caches reused from other sessions expire on their own."""
+        self.cache_manager.release()
 
-    def summarize_previous_messages(self):
-        self.message_handler.add_text_message(
-            "user", summarize_previous_messages_prompt
-        )
-        response = self.client.models.generate_content(
+    def fit_context_window(self):
+        """Stub out tool results of past turns, compact over the context target and start summarizing old turns in the background."""
+        self.message_handler.elide_tool_results()
+        window = self.message_handler.context_window
+        messages = self.message_handler.messages
+        if window.total(messages) > window.target_tokens:
+            window.compact(messages)
+        self.summarizer.schedule(messages)
+
+    def apply_summaries(self) -> bool:
+        """Swap in the summary finished since the last turn, called at a turn boundary."""
+        return self.summarizer.apply(self.message_handler.messages)
+
+    async def summarize_contents(self, contents: List[types.Content], prompt: str) -> str:
+        response = await self.client.aio.models.generate_content(
             model=self.cfg.model,
-            # Added prompt to messages
-            contents=self.message_handler.messages,
+            contents=contents + [types.Content(role="user", parts=[types.Part(text=prompt)])],
             config=self.get_config_no_tools(),
         )
-        # Clear messages
-        self.message_handler.messages = []
-        self.message_handler.add_text_message("model", response.text)
+        if response.usage_metadata:
+            self.message_handler.accumulated_token_count += response.usage_metadata.total_token_count or 0
+        return response.text
@@ -21,10 +21,24 @@ class GeminiConfig:
         
         
         # Configurable params
+        # Per-turn budgets, once one is used up the model gives a final answer without tools
         self.max_ai_iterations = 30
+        self.max_turn_tokens = 1_000_000 # Sum of usage_metadata.total_token_count, 0 for no limit
+        self.max_turn_seconds = 900 # 0 for no limit
         self.thinking_budget = 4096 # 0 for disabled
         self.temperature = 0.2
         self.include_thoughts = True
+        # Context cache lifetime, extended while the session is active so an idle cache expires soon
+        self.cache_ttl_seconds = 1800
+        self.cache_refresh_seconds = 300 # Minimum time between two TTL extensions
+        # Tokens of the repo map (layout, config files, top-level symbols) in the cached context, 0 to leave it out
+        self.repo_map_max_tokens = 4000
+        # Render responses while they are generated instead of after the last token
+        self.stream_responses = True
+        # Start function calls while the rest of the response is still streaming
+        self.pipeline_tool_calls = True
+        # Ask the model whether to continue when the local continuation rules can't tell
+        self.remote_continuation_check = True
 
     def get_tools_config(self, mode: types.FunctionCallingConfigMode):
         return types.ToolConfig(
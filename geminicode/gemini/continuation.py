@@ -0,0 +1,85 @@
+"""Decides whether the agent keeps working after a response.
+
+A response with function calls always goes on. Most others carry enough
+structure to decide locally: a marker the system prompt asks the model to end
+with, the finish reason, or a closing question to the user. Only responses
+none of these rules settle are sent to the remote classifier, and every
+decision is counted per rule.
+"""
+from collections import Counter
+from typing import Awaitable, Callable, Optional, Tuple
+from google.genai import types
+
+CONTINUE_MARKER = "[[CONTINUE]]"
+DONE_MARKER = "[[DONE]]"
+
+# Finish reasons after which the answer is not worth continuing
+_BLOCKED_FINISH_REASONS = {
+    types.FinishReason.SAFETY, types.FinishReason.RECITATION, types.FinishReason.BLOCKLIST,
+    types.FinishReason.PROHIBITED_CONTENT, types.FinishReason.SPII, types.FinishReason.IMAGE_SAFETY,
+}
+
+
+def strip_markers(text: str) -> str:
+    """Text as shown to the user, without the continuation markers."""
+    if not text:
+        return text
+    return text.replace(CONTINUE_MARKER, "").replace(DONE_MARKER, "").rstrip()
+
+
+class ContinuationPolicy:
+    """Local rules first, the remote classifier for what they leave open.
+
+    remote_check is an async callable taking the response text and returning a
+    bool; without one, ambiguous responses end the turn. Replace decide_locally
+    in a subclass to change the rules.
+    """
+
+    def __init__(self, remote_check: Optional[Callable[[str], Awaitable[bool]]] = None):
+        self.remote_check = remote_check
+        self.counters = Counter()
+
+    def decide_locally(self, text: str, finish_reason: Optional[types.FinishReason],
+                       has_function_calls: bool) -> Tuple[Optional[bool], str]:
+        """(decision, rule) where decision is None when the rules can't tell."""
+        if has_function_calls:
+            return True, "function_calls"
+        if finish_reason == types.FinishReason.MAX_TOKENS:
+            return True, "max_tokens"
+        if finish_reason in _BLOCKED_FINISH_REASONS:
+            return False, "blocked"
+        stripped = (text or "").rstrip()
+        if stripped.endswith(DONE_MARKER):
+            return False, "done_marker"
+        if stripped.endswith(CONTINUE_MARKER):
+            return True, "continue_marker"
+        if not stripped:
+            return False, "empty"
+        if stripped.endswith("?"):
+            return False, "question"
+        if DONE_MARKER in stripped:
+            return False, "done_marker"
+        if CONTINUE_MARKER in stripped:
+            return True, "continue_marker"
+        return None, "ambiguous"
+
+    async def should_continue(self, text: str, finish_reason: Optional[types.FinishReason] = None,
+                              has_function_calls: bool = False) -> bool:
+        decision, rule = self.decide_locally(text, finish_reason, has_function_calls)
+        if decision is None:
+            if self.remote_check is not None:
+                decision, rule = await self.remote_check(text), "remote"
+            else:
+                decision, rule = False, "default"
+        self.counters[rule] += 1
+        return decision
+
+    def stats(self):
+        """Decisions per rule, plus how many needed the remote classifier."""
+        total = sum(self.counters.values())
+        return {
+            "total": total,
+            "remote": self.counters["remote"],
+            "local": total - self.counters["remote"],
+            "by_rule": dict(self.counters),
+        }
@@ -0,0 +1,89 @@
+"""Content-addressed storage for large tool results that leave the live context.
+
+The full result of an older tool call is written once under the hash of its
+content, compressed like file bodies in the project index, and the history
+keeps a stub with its size, first lines and handle. expand_artifact reads it
+back by handle.
+"""
+import hashlib
+import os
+import tempfile
+from geminicode.work_tree.blobs import CODEC_RAW, CODEC_ZLIB, CODEC_ZSTD, compress_text, count_lines, iter_lines
+
+HANDLE_LENGTH = 16
+STUB_PREFIX = "[Stored tool result "
+
+# Head lines in a stub are cut at this many characters, e.g. minified or single-line output
+STUB_MAX_LINE_LENGTH = 200
+
+
+def artifact_directory(cwd):
+    """Artifacts live next to the project index and the message history."""
+    return os.path.join('/tmp', os.path.basename(cwd.rstrip(os.sep)), 'artifacts')
+
+
+def is_stub(text):
+    return text.startswith(STUB_PREFIX)
+
+
+class ArtifactStore:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, handle, codec):
+        return os.path.join(self.directory, f"{handle}.{codec}")
+
+    def put(self, text):
+        """Store `text` unless it already is, and return its handle."""
+        handle = hashlib.sha256(text.encode('utf-8')).hexdigest()[:HANDLE_LENGTH]
+        if self._find(handle) is not None:
+            return handle
+        codec, _, _, data = compress_text(text)
+        os.makedirs(self.directory, exist_ok=True)
+        # Write then rename, so a reader never sees half an artifact
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=f".{handle}.")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(handle, codec))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return handle
+
+    def _find(self, handle):
+        """Codec of a stored artifact, or None."""
+        if len(handle) != HANDLE_LENGTH or not all(c in '0123456789abcdef' for c in handle):
+            return None
+        for codec in (CODEC_ZSTD, CODEC_ZLIB, CODEC_RAW):
+            if os.path.exists(self._path(handle, codec)):
+                return codec
+        return None
+
+    def iter_lines(self, handle):
+        """Lines of an artifact, newlines included, or None for an unknown handle."""
+        codec = self._find(handle)
+        if codec is None:
+            return None
+        with open(self._path(handle, codec), 'rb') as f:
+            data = f.read()
+        return iter_lines(codec, data)
+
+    def stub(self, text, head_lines):
+        """Store `text` and return the stub that stands in for it in the history."""
+        handle = self.put(text)
+        total_lines = count_lines(text)
+        # Split on '\n' only, as count_lines and expand_artifact count lines
+        pieces = text.split('\n', head_lines)
+        head = pieces[:head_lines]
+        if len(pieces) <= head_lines and head and not head[-1]:
+            head.pop()
+        cut = sum(1 for line in head if len(line) > STUB_MAX_LINE_LENGTH)
+        head = [line if len(line) <= STUB_MAX_LINE_LENGTH else line[:STUB_MAX_LINE_LENGTH] + " [...]"
+                for line in head]
+        shown = f"first {len(head)} lines shown" if len(head) < total_lines else "all lines shown"
+        if cut:
+            shown += f", {cut} of them cut at {STUB_MAX_LINE_LENGTH} characters"
+        return (f"{STUB_PREFIX}{handle}: {len(text.encode('utf-8'))} bytes, {total_lines} lines, {shown}. "
+                f"Call expand_artifact with handle \"{handle}\" to read more.]\n" + "".join(line + "\n" for line in head))
@@ -0,0 +1,182 @@
+"""Token accounting for the conversation history sent with every request.
+
+Each message is estimated locally when it is added. After every request the
+prompt_token_count of usage_metadata tells how large the history really was:
+when the earlier messages are unchanged, the difference to the previous
+request is what the new messages cost, otherwise the estimates are rescaled
+to the measured total. What to compact or summarize is then chosen by token
+weight instead of by message count.
+"""
+import json
+from typing import List, Optional
+from google.genai import types
+from geminicode.utils.tokens import estimate_tokens
+
+# Role, part and function-call framing the tokenizer adds around each part
+PART_OVERHEAD_TOKENS = 4
+
+# Room left for the summary that replaces a summarized prefix
+SUMMARY_RESERVE_TOKENS = 2000
+
+
+def estimate_content_tokens(content: types.Content) -> int:
+    tokens = 0
+    for part in content.parts or []:
+        tokens += PART_OVERHEAD_TOKENS
+        if part.text:
+            tokens += estimate_tokens(part.text)
+        elif part.function_call:
+            tokens += estimate_tokens(part.function_call.name + json.dumps(part.function_call.args, default=str))
+        elif part.function_response:
+            tokens += estimate_tokens(part.function_response.name
+                                      + json.dumps(part.function_response.response, default=str))
+    return tokens
+
+
+def is_turn_start(content: types.Content) -> bool:
+    """A user text message, not the results of function calls.
+
+    Messages the client injects into a turn have the same shape, see
+    ContextWindow.is_user_input.
+    """
+    return (content.role == "user"
+            and any(part.text for part in content.parts or [])
+            and not any(part.function_response for part in content.parts or []))
+
+
+class ContextWindow:
+    """Sizes of the messages in the history and the decisions that keep it under target_tokens.
+
+    The most recent turns, at least keep_recent_tokens of them, always stay
+    verbatim. Before that, large function results are compacted first, as
+    they are the cheapest to lose, and only then is the oldest part of the
+    conversation summarized.
+    """
+
+    def __init__(self, target_tokens: int, keep_recent_tokens: int, compact_keep_chars: int):
+        self.target_tokens = target_tokens
+        self.keep_recent_tokens = keep_recent_tokens
+        self.compact_keep_chars = compact_keep_chars
+        self.scale = 1.0
+        # id(content) -> (content, measured tokens), the content is kept to detect reused ids
+        self._measured = {}
+        self._last_observed = None
+        # id(content) -> content of user messages injected by the client, e.g. continuation nudges
+        self._injected = {}
+
+    def mark_injected(self, content: types.Content):
+        """Record a user message the client added within a turn, it does not start a new turn."""
+        self._injected[id(content)] = content
+
+    def is_injected(self, content: types.Content) -> bool:
+        return self._injected.get(id(content)) is content
+
+    def is_user_input(self, content: types.Content) -> bool:
+        """A message typed by the user, the start of a turn."""
+        return is_turn_start(content) and not self.is_injected(content)
+
+    def size(self, content: types.Content) -> int:
+        measured = self._measured.get(id(content))
+        if measured is not None and measured[0] is content:
+            return measured[1]
+        return int(estimate_content_tokens(content) * self.scale)
+
+    def total(self, messages: List[types.Content]) -> int:
+        return sum(self.size(content) for content in messages)
+
+    def observe(self, messages: List[types.Content], usage_metadata: types.GenerateContentResponseUsageMetadata):
+        """Calibrate against the prompt tokens of a request that sent `messages`."""
+        if not usage_metadata or not usage_metadata.prompt_token_count or not messages:
+            return
+        history_tokens = usage_metadata.prompt_token_count - (usage_metadata.cached_content_token_count or 0)
+        previous = self._last_observed
+        self._last_observed = (list(messages), history_tokens)
+        present = {id(content): content for content in messages}
+        self._measured = {key: value for key, value in self._measured.items() if present.get(key) is value[0]}
+        self._injected = {key: content for key, content in self._injected.items() if present.get(key) is content}
+
+        if previous is not None:
+            previous_messages, previous_tokens = previous
+            count = len(previous_messages)
+            unchanged = (len(messages) > count
+                         and all(a is b for a, b in zip(previous_messages, messages[:count])))
+            delta = history_tokens - previous_tokens
+            if unchanged and delta > 0:
+                # Spread the measured growth over the new messages by their estimates
+                new_messages = messages[count:]
+                estimates = [max(1, estimate_content_tokens(content)) for content in new_messages]
+                for content, estimate in zip(new_messages, estimates):
+                    self._measured[id(content)] = (content, max(1, delta * estimate // sum(estimates)))
+                return
+
+        estimated = sum(estimate_content_tokens(content) for content in messages)
+        if estimated:
+            self.scale = history_tokens / estimated
+            self._measured = {}
+
+    def forget(self, content: types.Content):
+        """Drop the measured size of a content that was changed in place."""
+        self._measured.pop(id(content), None)
+        self._last_observed = None
+
+    def recent_start(self, messages: List[types.Content]) -> int:
+        """Index of the first message of the recent turns that stay verbatim, 0 when everything is recent."""
+        tokens = 0
+        for index in range(len(messages) - 1, -1, -1):
+            tokens += self.size(messages[index])
+            if self.is_user_input(messages[index]) and tokens >= self.keep_recent_tokens:
+                return index
+        return 0
+
+    def compact(self, messages: List[types.Content]) -> int:
+        """Shorten the largest function results before the recent turns until the history fits.
+
+        Returns the tokens saved.
+        """
+        saved = 0
+        excess = self.total(messages) - self.target_tokens
+        if excess <= 0:
+            return 0
+        candidates = []
+        for content in messages[:self.recent_start(messages)]:
+            for index, part in enumerate(content.parts or []):
+                if part.function_response:
+                    result = (part.function_response.response or {}).get("result")
+                    if not isinstance(result, str):
+                        result = json.dumps(part.function_response.response, default=str)
+                    if len(result) > 2 * self.compact_keep_chars:
+                        candidates.append((len(result), content, index, result))
+        for _, content, index, result in sorted(candidates, key=lambda candidate: -candidate[0]):
+            if saved >= excess:
+                break
+            before = self.size(content)
+            part = content.parts[index]
+            omitted = len(result) - 2 * self.compact_keep_chars
+            content.parts[index] = types.Part.from_function_response(
+                name=part.function_response.name,
+                response={"result": (f"{result[:self.compact_keep_chars]}\n"
+                                     f"... [compacted: {omitted} of {len(result)} characters omitted] ...\n"
+                                     f"{result[-self.compact_keep_chars:]}")},
+            )
+            self.forget(content)
+            saved += before - self.size(content)
+        return saved
+
+    def summarize_upto(self, messages: List[types.Content], target_tokens: Optional[int] = None) -> int:
+        """Length of the oldest prefix to summarize so the rest fits, 0 when nothing needs to be.
+
+        The prefix always ends at a turn boundary, before the recent turns.
+        target_tokens defaults to the window's target.
+        """
+        if target_tokens is None:
+            target_tokens = self.target_tokens
+        total = self.total(messages)
+        if total <= target_tokens:
+            return 0
+        limit = self.recent_start(messages)
+        prefix = 0
+        for index, content in enumerate(messages[:limit]):
+            if index and self.is_user_input(content) and total - prefix + SUMMARY_RESERVE_TOKENS <= target_tokens:
+                return index
+            prefix += self.size(content)
+        return limit
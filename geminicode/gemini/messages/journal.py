@@ -0,0 +1,202 @@
+"""Append-only JSONL journal of the message history.
+
+Every record sets one message slot: `{"at": i, "message": {...}}` cuts the
+history to i messages and appends the message, `"message": null` only cuts
+it. New messages are appended as records; a message changed in place, or a
+prefix replaced by a summary, is rewritten from its index on. Records are
+flushed on every save and fsynced in batches. Once the journal is several
+times larger than the records of the live messages, it is compacted into a
+fresh file that replaces the old one atomically.
+
+Messages the client injected into a turn carry `"injected": true`, so they
+are still told apart from user input after a resume.
+
+Loading only reads the index of each record. The JSON of a message is parsed
+only if it survives the replay, so superseded records, like the full tool
+results later replaced by stubs, cost nothing on resume. A partial last line
+left by a crash is cut off.
+"""
+import json
+import os
+import re
+import tempfile
+from typing import Callable, List
+from google.genai import types
+
+_RECORD_RE = re.compile(rb'^\{"at": (\d+), "message": ')
+
+
+def serialize_content(content: types.Content, injected: bool = False) -> dict:
+    parts = []
+    for part in content.parts or []:
+        if part.text:
+            parts.append({"text": part.text})
+        elif part.function_call:
+            parts.append({
+                "function_call": {
+                    "name": part.function_call.name,
+                    "args": part.function_call.args
+                }
+            })
+        elif part.function_response:
+            parts.append({
+                "function_response": {
+                    "name": part.function_response.name,
+                    "response": part.function_response.response
+                }
+            })
+    data = {"role": content.role, "parts": parts}
+    if injected:
+        data["injected"] = True
+    return data
+
+
+def deserialize_content(data: dict) -> types.Content:
+    parts = []
+    for part_data in data["parts"]:
+        if "text" in part_data:
+            parts.append(types.Part(text=part_data["text"]))
+        elif "function_call" in part_data:
+            parts.append(types.Part(function_call=types.FunctionCall(
+                name=part_data["function_call"]["name"],
+                args=part_data["function_call"]["args"]
+            )))
+        elif "function_response" in part_data:
+            parts.append(types.Part.from_function_response(
+                name=part_data["function_response"]["name"],
+                response=part_data["function_response"]["response"]
+            ))
+    return types.Content(role=data["role"], parts=parts)
+
+
+def _record(at, content, injected=False):
+    message = json.dumps(serialize_content(content, injected), default=str) if content is not None else "null"
+    return f'{{"at": {at}, "message": {message}}}\n'.encode('utf-8')
+
+
+class HistoryJournal:
+    def __init__(self, path: str, fsync_batch: int, compact_min_bytes: int, compact_ratio: float,
+                 is_injected: Callable[[types.Content], bool] = lambda content: False):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.compact_min_bytes = compact_min_bytes
+        self.compact_ratio = compact_ratio
+        self.is_injected = is_injected
+        # Injected messages of the last load
+        self.loaded_injected = []
+        self._file = None
+        self._bytes = 0
+        self._unsynced = 0
+        # (content, parts, record size) of every journaled message, to find what changed since
+        self._written = []
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self) -> List[types.Content]:
+        """Replay the journal into the message history."""
+        slots = []
+        good_end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                good_end += len(line)
+                match = _RECORD_RE.match(line)
+                if not match:
+                    continue
+                at = int(match.group(1))
+                del slots[at:]
+                if line[match.end():match.end() + 4] != b'null':
+                    slots.append(line)
+        if good_end != os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_end)
+
+        messages = []
+        self.loaded_injected = []
+        for line in slots:
+            data = json.loads(line)["message"]
+            messages.append(deserialize_content(data))
+            if data.get("injected"):
+                self.loaded_injected.append(messages[-1])
+        self._bytes = good_end
+        self._written = [(content, list(content.parts or []), len(line)) for content, line in zip(messages, slots)]
+        return messages
+
+    def _first_change(self, messages):
+        for index, (content, parts, _) in enumerate(self._written):
+            if index >= len(messages) or messages[index] is not content:
+                return index
+            current = messages[index].parts or []
+            if len(current) != len(parts) or any(a is not b for a, b in zip(current, parts)):
+                return index
+        return len(self._written)
+
+    def save(self, messages: List[types.Content]):
+        """Append records for what changed since the last save, compacting the journal when it is due."""
+        start = self._first_change(messages)
+        if start == len(messages) == len(self._written):
+            return
+
+        records = [_record(index, messages[index], self.is_injected(messages[index]))
+                   for index in range(start, len(messages))]
+        written = self._written[:start] + [
+            (content, list(content.parts or []), len(record)) for content, record in zip(messages[start:], records)]
+        if not records:
+            records = [_record(start, None)]
+        size = sum(len(record) for record in records)
+        live_bytes = sum(entry[2] for entry in written)
+        if self._bytes + size > max(self.compact_min_bytes, live_bytes * self.compact_ratio):
+            self.compact(messages)
+            return
+
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'ab')
+        self._file.write(b"".join(records))
+        self._file.flush()
+        self._bytes += size
+        self._unsynced += len(records)
+        if self._unsynced >= self.fsync_batch:
+            self.sync()
+        self._written = written
+
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def compact(self, messages: List[types.Content]):
+        """Rewrite the journal as one record per live message, replacing the old file atomically."""
+        self.close()
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".history.")
+        written = []
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for index, content in enumerate(messages):
+                    record = _record(index, content, self.is_injected(content))
+                    f.write(record)
+                    written.append((content, list(content.parts or []), len(record)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        directory_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+        self._bytes = sum(entry[2] for entry in written)
+        self._written = written
+
+    def close(self):
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
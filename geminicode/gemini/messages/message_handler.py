@@ -1,13 +1,28 @@
 import json
 import os
-from typing import Optional
+from typing import List, Optional
 from google.genai import types
+from geminicode.config import (
+    CONTEXT_COMPACT_KEEP_CHARS, CONTEXT_KEEP_RECENT_TOKENS, CONTEXT_TARGET_TOKENS,
+    TOOL_RESULT_ELIDE_MIN_BYTES, TOOL_RESULT_STUB_HEAD_LINES,
+    HISTORY_FSYNC_BATCH, HISTORY_COMPACT_MIN_BYTES, HISTORY_COMPACT_RATIO,
+)
+from geminicode.gemini.messages.artifacts import ArtifactStore, artifact_directory, is_stub
+from geminicode.gemini.messages.context_window import ContextWindow
+from geminicode.gemini.messages.journal import HistoryJournal, deserialize_content
 
 class MessageHandler:
     def __init__(self, cwd: str):
         self.messages = []
         self.accumulated_token_count = 0
-        self.history_file = f"/tmp/{cwd.split('/')[-1]}/history.json"
+        self.context_window = ContextWindow(CONTEXT_TARGET_TOKENS, CONTEXT_KEEP_RECENT_TOKENS,
+                                            CONTEXT_COMPACT_KEEP_CHARS)
+        self.artifacts = ArtifactStore(artifact_directory(cwd))
+        self.history_file = f"/tmp/{cwd.split('/')[-1]}/history.jsonl"
+        self.legacy_history_file = f"/tmp/{cwd.split('/')[-1]}/history.json"
+        self.journal = HistoryJournal(self.history_file, HISTORY_FSYNC_BATCH,
+                                      HISTORY_COMPACT_MIN_BYTES, HISTORY_COMPACT_RATIO,
+                                      is_injected=self.context_window.is_injected)
         self.load_message_history()
 
     def add_text_message(self, role: str, message: str):
@@ -16,23 +31,63 @@ class MessageHandler:
             parts=[types.Part(text=message)]
         ))
 
+    def add_injected_message(self, message: str):
+        """Add a user message on behalf of the client within the current turn, e.g. a continuation nudge."""
+        self.add_text_message("user", message)
+        self.context_window.mark_injected(self.messages[-1])
+
     def add_function_call_with_result(self, function_call: types.FunctionCall, result: str):
-        function_response_part = types.Part.from_function_response(
-            name=function_call.name,
-            response={"result": result}
-        )
+        self.add_function_calls_with_results([function_call], [result])
+
+    def add_function_calls_with_results(self, function_calls: List[types.FunctionCall], results: List[str]):
+        """Record the calls of one model response as one model turn and their results as one user turn."""
+        function_response_parts = [
+            types.Part.from_function_response(
+                name=function_call.name,
+                response={"result": result}
+            )
+            for function_call, result in zip(function_calls, results)
+        ]
 
         model_function_call_content = types.Content(
             role="model",
-            parts=[types.Part(function_call=function_call)]
+            parts=[types.Part(function_call=function_call) for function_call in function_calls]
         )
         user_function_response_content = types.Content(
             role="user",
-            parts=[function_response_part]
+            parts=function_response_parts
         )
         self.messages.append(model_function_call_content)
         self.messages.append(user_function_response_content)
     
+    def elide_tool_results(self) -> int:
+        """Move large tool results of every turn but the latest to the artifact store, leaving stubs.
+
+        Returns how many results were replaced.
+        """
+        latest_turn = max((index for index, content in enumerate(self.messages)
+                           if self.context_window.is_user_input(content)), default=0)
+        elided = 0
+        for content in self.messages[:latest_turn]:
+            for index, part in enumerate(content.parts or []):
+                if not part.function_response:
+                    continue
+                result = (part.function_response.response or {}).get("result")
+                if not isinstance(result, str):
+                    result = json.dumps(part.function_response.response, default=str)
+                if is_stub(result) or len(result.encode('utf-8')) < TOOL_RESULT_ELIDE_MIN_BYTES:
+                    continue
+                content.parts[index] = types.Part.from_function_response(
+                    name=part.function_response.name,
+                    response={"result": self.artifacts.stub(result, TOOL_RESULT_STUB_HEAD_LINES)},
+                )
+                self.context_window.forget(content)
+                elided += 1
+        return elided
+
+    def context_tokens(self) -> int:
+        return self.context_window.total(self.messages)
+
     def get_last_message(self) -> Optional[types.Content]:
         if len(self.messages) == 0:
             return None
@@ -40,58 +95,26 @@ class MessageHandler:
 
     def save_message_history(self):
         try:
-            # Convert types.Content objects to a serializable format
-            serializable_messages = []
-            for message in self.messages:
-                serializable_parts = []
-                for part in message.parts:
-                    if part.text:
-                        serializable_parts.append({"text": part.text})
-                    elif part.function_call:
-                        serializable_parts.append({
-                            "function_call": {
-                                "name": part.function_call.name,
-                                "args": part.function_call.args
-                            }
-                        })
-                    elif part.function_response:
-                        serializable_parts.append({
-                            "function_response": {
-                                "name": part.function_response.name,
-                                "response": part.function_response.response
-                            }
-                        })
-                serializable_messages.append({"role": message.role, "parts": serializable_parts})
-
-            with open(self.history_file, 'w') as f:
-                json.dump(serializable_messages, f, indent=4)
+            self.journal.save(self.messages)
         except Exception as e:
             print(f"Error saving message history: {e}")
 
     def load_message_history(self):
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    loaded_messages = json.load(f)
-                
-                # Convert loaded data back to types.Content objects
-                self.messages = []
-                for msg_data in loaded_messages:
-                    parts = []
-                    for part_data in msg_data["parts"]:
-                        if "text" in part_data:
-                            parts.append(types.Part(text=part_data["text"]))
-                        elif "function_call" in part_data:
-                            parts.append(types.Part(function_call=types.FunctionCall(
-                                name=part_data["function_call"]["name"],
-                                args=part_data["function_call"]["args"]
-                            )))
-                        elif "function_response" in part_data:
-                            parts.append(types.Part.from_function_response(
-                                name=part_data["function_response"]["name"],
-                                response=part_data["function_response"]["response"]
-                            ))
-                    self.messages.append(types.Content(role=msg_data["role"], parts=parts))
-            except Exception as e:
-                print(f"Error loading message history: {e}")
-                self.messages = [] # Clear messages if loading fails
+        try:
+            if self.journal.exists():
+                self.messages = self.journal.load()
+                for content in self.journal.loaded_injected:
+                    self.context_window.mark_injected(content)
+            elif os.path.exists(self.legacy_history_file):
+                # History written before the journal, moved over once
+                with open(self.legacy_history_file, 'r') as f:
+                    self.messages = [deserialize_content(data) for data in json.load(f)]
+                self.journal.compact(self.messages)
+                os.remove(self.legacy_history_file)
+        except Exception as e:
+            print(f"Error loading message history: {e}")
+            self.messages = [] # Clear messages if loading fails
+
+    def close_history(self):
+        """Flush and fsync what the journal has not synced yet."""
+        self.journal.close()
@@ -0,0 +1,125 @@
+"""Rolling, hierarchical summaries of old conversation turns, made in the background.
+
+The history starts with at most one summary message whose parts are summary
+checkpoints, oldest first, each tagged with its level. When the verbatim
+history grows past a share of the context target, the oldest turns that have
+to go are summarized into a new level 0 checkpoint; once there are too many
+checkpoints they are merged into one of the next level. Both run as an
+asyncio task while the user types and are swapped into the history at the
+next turn boundary, only if the messages they replace are still in place.
+"""
+import asyncio
+import re
+from typing import Awaitable, Callable, List, Optional
+from google.genai import types
+from geminicode.gemini.messages.context_window import ContextWindow
+
+SUMMARY_TAG = "[Summary of earlier conversation, level {level}]"
+_SUMMARY_TAG_RE = re.compile(r"^\[Summary of earlier conversation, level (\d+)\]")
+
+
+def summary_level(part: types.Part) -> Optional[int]:
+    match = _SUMMARY_TAG_RE.match(part.text or "")
+    return int(match.group(1)) if match else None
+
+
+def is_summary(content: types.Content) -> bool:
+    return (content.role == "model" and bool(content.parts)
+            and all(summary_level(part) is not None for part in content.parts))
+
+
+class SummaryCheckpoint:
+    """A new head summary, ready to replace messages[start:end] including the old head summary."""
+
+    def __init__(self, start, replaced, head):
+        self.start = start
+        self.replaced = replaced
+        self.head = head
+
+    @property
+    def end(self):
+        return self.start + len(self.replaced)
+
+
+class RollingSummarizer:
+    """Schedules one background summarization at a time and applies its checkpoint.
+
+    summarize is an async callable taking the contents to summarize and the
+    instruction to append, and returning the summary text.
+    """
+
+    def __init__(self, summarize: Callable[[List[types.Content], str], Awaitable[str]],
+                 context_window: ContextWindow, summarize_at: float, max_summaries: int,
+                 segment_prompt: str, merge_prompt: str):
+        self.summarize = summarize
+        self.context_window = context_window
+        self.summarize_at = summarize_at
+        self.max_summaries = max_summaries
+        self.segment_prompt = segment_prompt
+        self.merge_prompt = merge_prompt
+        self.task = None
+        self.checkpoint = None
+        self.error = None
+
+    @property
+    def running(self):
+        return self.task is not None and not self.task.done()
+
+    def schedule(self, messages: List[types.Content]) -> bool:
+        """Start summarizing in the background if the history needs it, returns whether a job started."""
+        if self.running or self.checkpoint is not None:
+            return False
+        head = messages[0] if messages and is_summary(messages[0]) else None
+        if head is not None and len(head.parts) > self.max_summaries:
+            self.task = asyncio.create_task(self._merge(head))
+            return True
+        start = 1 if head is not None else 0
+        upto = self.context_window.summarize_upto(
+            messages, int(self.context_window.target_tokens * self.summarize_at))
+        if upto <= start:
+            return False
+        self.task = asyncio.create_task(self._summarize_segment(head, list(messages[start:upto])))
+        return True
+
+    async def _summarize_segment(self, head, replaced):
+        text = await self._run(replaced, self.segment_prompt)
+        if text is None:
+            return
+        parts = list(head.parts) if head is not None else []
+        parts.append(types.Part(text=f"{SUMMARY_TAG.format(level=0)}\n{text}"))
+        self.checkpoint = SummaryCheckpoint(
+            0, ([head] if head is not None else []) + replaced, types.Content(role="model", parts=parts))
+
+    async def _merge(self, head):
+        level = max(summary_level(part) for part in head.parts) + 1
+        text = await self._run([head], self.merge_prompt)
+        if text is None:
+            return
+        self.checkpoint = SummaryCheckpoint(
+            0, [head], types.Content(role="model", parts=[types.Part(text=f"{SUMMARY_TAG.format(level=level)}\n{text}")]))
+
+    async def _run(self, contents, prompt):
+        try:
+            return await self.summarize(contents, prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The history stays verbatim, the next turn boundary tries again
+            self.error = e
+            return None
+
+    def apply(self, messages: List[types.Content]) -> bool:
+        """Swap a finished checkpoint into `messages` in place, returns whether the history changed."""
+        checkpoint = self.checkpoint
+        if checkpoint is None:
+            return False
+        self.checkpoint = None
+        current = messages[checkpoint.start:checkpoint.end]
+        if len(current) != len(checkpoint.replaced) or any(a is not b for a, b in zip(current, checkpoint.replaced)):
+            return False
+        messages[checkpoint.start:checkpoint.end] = [checkpoint.head]
+        return True
+
+    def cancel(self):
+        if self.running:
+            self.task.cancel()
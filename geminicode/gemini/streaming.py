@@ -0,0 +1,45 @@
+from google.genai import types
+
+
+class ResponseAssembler:
+    """Builds one GenerateContentResponse out of the chunks of a streamed response.
+
+    Consecutive text chunks of the same kind (thought or answer) are merged into
+    a single part, so the assembled candidate has the same shape as a
+    non-streamed one and the rest of the client does not care how it arrived.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.finish_reason = None
+        self.usage_metadata = None
+
+    def add_chunk(self, chunk: types.GenerateContentResponse):
+        """Fold a chunk in and return its new parts, for live rendering."""
+        if chunk.usage_metadata:
+            self.usage_metadata = chunk.usage_metadata
+        if not chunk.candidates:
+            return []
+        candidate = chunk.candidates[0]
+        if candidate.finish_reason:
+            self.finish_reason = candidate.finish_reason
+        if not candidate.content or not candidate.content.parts:
+            return []
+        for part in candidate.content.parts:
+            self._add_part(part)
+        return candidate.content.parts
+
+    def _add_part(self, part: types.Part):
+        last = self.parts[-1] if self.parts else None
+        if (part.text is not None and last is not None and last.text is not None
+                and bool(last.thought) == bool(part.thought)):
+            self.parts[-1] = types.Part(text=last.text + part.text, thought=last.thought)
+        else:
+            self.parts.append(part)
+
+    def response(self) -> types.GenerateContentResponse:
+        content = types.Content(role="model", parts=self.parts) if self.parts else None
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=content, finish_reason=self.finish_reason)],
+            usage_metadata=self.usage_metadata,
+        )
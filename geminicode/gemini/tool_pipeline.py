@@ -0,0 +1,44 @@
+import asyncio
+from google.genai import types
+
+
+class ToolPipeline:
+    """Starts the function calls of one model response as soon as each one is known.
+
+    Read-only and MCP calls start right away and run concurrently. A call that
+    changes the tree or runs a command first waits for every call submitted
+    before it, and the calls after it wait for it, so side effects happen in
+    the order the model asked for. Results are always returned in call order.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.function_calls = []
+        self.tasks = []
+        self._barrier = None
+        self._since_barrier = []
+
+    def submit(self, function_call: types.FunctionCall):
+        if self.client.is_concurrent_call(function_call):
+            waits_for = [self._barrier] if self._barrier else []
+            task = asyncio.create_task(self._run(function_call, waits_for))
+            self._since_barrier.append(task)
+        else:
+            waits_for = self._since_barrier + ([self._barrier] if self._barrier else [])
+            task = asyncio.create_task(self._run(function_call, waits_for))
+            self._barrier = task
+            self._since_barrier = []
+        self.function_calls.append(function_call)
+        self.tasks.append(task)
+
+    async def _run(self, function_call, waits_for):
+        if waits_for:
+            await asyncio.wait(waits_for)
+        return await self.client.execute_function_call(function_call)
+
+    async def results(self):
+        return await asyncio.gather(*self.tasks)
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
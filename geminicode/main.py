@@ -1,5 +1,7 @@
 import os
+import signal
 import sys
+import threading
 import traceback
 import asyncio
 from rich.prompt import Prompt
@@ -11,19 +13,66 @@ from geminicode.work_tree.tree import WorkTree
 from geminicode.gemini.client import AIClient
 from geminicode.console.console import ConsoleWrapper
 from geminicode.utils.logger import logger
-from geminicode.config import GEMINI_MODEL_2_0_FLASH, GEMINI_MODEL_2_5_FLASH_PREVIEW_05_20, MAX_MESSAGES_IN_CONTEXT
+from geminicode.config import GEMINI_MODEL_2_0_FLASH, GEMINI_MODEL_2_5_FLASH_PREVIEW_05_20
 
 
 async def on_exit(ai_client: AIClient, console: ConsoleWrapper):
+    ai_client.summarizer.cancel()
+    ai_client.message_handler.close_history()
+    console.print_continuation_stats(ai_client.continuation_policy.stats())
     console.print_exit()
+    ai_client.cfg.work_tree.stop_watching()
     ai_client.delete_cache()
     await ai_client.cfg.mcp_handler.cleanup()
 
+async def _run_turn(ai_client: AIClient, console: ConsoleWrapper):
+    """Answers the last user message. Ctrl+C cancels this turn only, the session goes on."""
+    loop = asyncio.get_running_loop()
+    turn = asyncio.ensure_future(ai_client.process_messages())
+    try:
+        loop.add_signal_handler(signal.SIGINT, turn.cancel)
+    except (NotImplementedError, RuntimeError):
+        pass  # No signal handlers on this platform, Ctrl+C exits as before
+    try:
+        await turn
+    except asyncio.CancelledError:
+        if not turn.cancelled():
+            raise
+        console.print_turn_cancelled()
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+async def _ask_user(prompt: str) -> str:
+    """Prompt.ask on a thread, so background work such as summarization runs while the user types.
+
+    The thread is a daemon so Ctrl+C at the prompt still exits without waiting for input.
+    """
+    loop = asyncio.get_running_loop()
+    answer = loop.create_future()
+
+    def settle(setter, value):
+        if not answer.done():
+            setter(value)
+
+    def ask():
+        try:
+            value = Prompt.ask(prompt)
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, answer.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(settle, answer.set_result, value)
+
+    threading.Thread(target=ask, name="prompt", daemon=True).start()
+    return await answer
+
 async def _run_cli_loop(ai_client: AIClient, console: ConsoleWrapper):
     """Runs the main CLI interaction loop."""
     while True:
         try:
-            user_input = Prompt.ask("\n[user]You[/user]")
+            user_input = await _ask_user("\n[user]You[/user]")
 
             if user_input.lower() in ["exit", "quit"]:
                 await on_exit(ai_client, console)
@@ -32,17 +81,17 @@ async def _run_cli_loop(ai_client: AIClient, console: ConsoleWrapper):
             if not user_input:
                 continue
 
+            # Turn boundary, swap in what was summarized while the user typed
+            ai_client.apply_summaries()
             ai_client.message_handler.add_text_message("user", user_input)
-            await ai_client.process_messages()
-            ai_client.reset_max_iterations()
+            await _run_turn(ai_client, console)
 
-            if len(ai_client.message_handler.messages) > MAX_MESSAGES_IN_CONTEXT:
-                ai_client.summarize_previous_messages()
-                # Save message history after summarization
+            ai_client.fit_context_window()
             ai_client.message_handler.save_message_history()
 
             console.print_token_count(
-                ai_client.message_handler.accumulated_token_count
+                ai_client.message_handler.accumulated_token_count,
+                ai_client.message_handler.context_tokens(),
             )
 
         except Exception as e:
@@ -55,7 +104,11 @@ async def get_ai_client():
     mcp_client = MCPClientHandler()
     await mcp_client.initialize()
     
-    ai_config = GeminiConfig(model=GEMINI_MODEL_2_5_FLASH_PREVIEW_05_20, work_tree=WorkTree(ctx), ctx=ctx, mcp_handler=mcp_client, tool_handler=ToolHandler())
+    work_tree = WorkTree(ctx)
+    if ctx.watch_files:
+        work_tree.start_watching()
+
+    ai_config = GeminiConfig(model=GEMINI_MODEL_2_5_FLASH_PREVIEW_05_20, work_tree=work_tree, ctx=ctx, mcp_handler=mcp_client, tool_handler=ToolHandler())
     ai_client = AIClient(ai_config)
     return ai_client
 
@@ -63,6 +116,7 @@ async def main():
     console = ConsoleWrapper()
     ai_client = await get_ai_client()
     console.print_welcome()
+    console.print_reindex_report(ai_client.cfg.work_tree.reindex_report)
 
     await _run_cli_loop(ai_client, console)
 
@@ -0,0 +1,100 @@
+from typing import Dict, Any
+from geminicode.work_tree.tree import WorkTree
+from geminicode.utils.files import read_text_file
+from geminicode.utils.patch import PatchError, apply_search_replace, apply_unified_diff
+
+
+def edit_file_tool() -> Dict[str, Any]:
+    """Tool definition for changing part of an existing file without resending all of it."""
+    return {
+        "name": "edit_file",
+        "description": "Edit an existing file by sending only the changed parts: either a list of search/replace edits or a unified diff. Every search text or hunk must match the current file exactly (including indentation), otherwise nothing is written and the error shows where the file differs. Prefer this over write_file for changes to existing files.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "file_path": {
+                    "type": "string",
+                    "description": "The full path to the file to edit"
+                },
+                "edits": {
+                    "type": "array",
+                    "description": "Search/replace edits applied in order. Use either edits or diff.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "search": {
+                                "type": "string",
+                                "description": "Exact text to find, copied from the file. Include enough lines to be unique."
+                            },
+                            "replace": {
+                                "type": "string",
+                                "description": "Text to put in its place. Empty to delete it."
+                            },
+                            "replace_all": {
+                                "type": "boolean",
+                                "description": "Replace every occurrence instead of requiring exactly one. Defaults to false."
+                            }
+                        },
+                        "required": ["search", "replace"]
+                    }
+                },
+                "diff": {
+                    "type": "string",
+                    "description": "A unified diff for this one file (@@ -start,count +start,count @@ hunks with ' ', '-', '+' lines). Use either edits or diff."
+                }
+            },
+            "required": ["file_path"]
+        }
+    }
+
+
+def edit_file_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
+    """Handler for applying search/replace edits or a unified diff to a file.
+
+    Args:
+        work_tree: The WorkTree instance containing the database connection
+        params: Dictionary containing the parameters for the tool
+            - file_path: The full path to the file to edit
+            - edits: List of {"search", "replace", "replace_all"} edits
+            - diff: A unified diff, instead of edits
+
+    Returns:
+        str: Success message with the changed lines, or an error message
+    """
+    file_path = params.get("file_path")
+    edits = params.get("edits")
+    diff = params.get("diff")
+
+    if not file_path:
+        return "Error: file_path parameter is required"
+    if bool(edits) == bool(diff):
+        return "Error: pass exactly one of edits or diff"
+
+    # Edits are validated against the file on disk, the index may lag behind it.
+    content = read_text_file(file_path)
+    if content is None:
+        return f"Error: {file_path} does not exist or is not a UTF-8 text file"
+
+    try:
+        if edits:
+            new_content, changed_lines = apply_search_replace(content, edits)
+        else:
+            new_content, changed_lines = apply_unified_diff(content, diff)
+    except PatchError as e:
+        return f"Error: {e}. The file was not changed."
+
+    if new_content == content:
+        return f"No changes: the edits leave {file_path} as it was"
+
+    try:
+        with open(file_path, 'wb') as f:
+            f.write(new_content.encode('utf-8'))
+        work_tree.save_to_db(file_path, new_content)
+    except Exception as e:
+        return f"Error writing file: {str(e)}"
+
+    kind = "edit" if edits else "hunk"
+    count = len(changed_lines)
+    lines = ", ".join(str(line) for line in changed_lines)
+    return (f"Successfully applied {count} {kind}{'s' if count != 1 else ''} to {file_path} "
+            f"at line{'s' if count != 1 else ''} {lines}")
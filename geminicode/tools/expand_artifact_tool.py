@@ -0,0 +1,98 @@
+from typing import Dict, Any
+from geminicode.config import READ_FILE_DEFAULT_MAX_BYTES, READ_FILE_MAX_BYTES
+from geminicode.gemini.messages.artifacts import ArtifactStore, artifact_directory
+from geminicode.work_tree.tree import WorkTree
+
+
+def expand_artifact_tool() -> Dict[str, Any]:
+    """Tool definition for reading a stored tool result back."""
+    return {
+        "name": "expand_artifact",
+        "description": "Read a large tool result from an earlier turn that was replaced in the conversation by a '[Stored tool result <handle>: ...]' stub. Returns the requested lines with a header giving the total line count. Only expand what you need; re-running the original tool is usually not necessary.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "handle": {
+                    "type": "string",
+                    "description": "The handle from the stub, e.g. 3f2a9c0d1e4b5a6f"
+                },
+                "start_line": {
+                    "type": "integer",
+                    "description": "First line to return (1-based, inclusive). Defaults to 1."
+                },
+                "end_line": {
+                    "type": "integer",
+                    "description": "Last line to return (1-based, inclusive). Defaults to the end of the result."
+                },
+                "max_bytes": {
+                    "type": "integer",
+                    "description": f"Maximum bytes of content to return. Defaults to {READ_FILE_DEFAULT_MAX_BYTES}, at most {READ_FILE_MAX_BYTES}."
+                }
+            },
+            "required": ["handle"]
+        }
+    }
+
+
+def expand_artifact_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
+    """Handler for reading a stored tool result back.
+
+    Args:
+        work_tree: The WorkTree instance, used for the project path
+        params: Dictionary containing the parameters for the tool
+            - handle: The handle from the stub
+            - start_line, end_line: Optional 1-based inclusive line range
+            - max_bytes: Optional cap on the returned content
+
+    Returns:
+        str: A header line followed by the requested lines, or an error message
+    """
+    handle = (params.get("handle") or "").strip()
+    if not handle:
+        return "Error: handle parameter is required"
+
+    try:
+        start_line = max(1, int(params.get("start_line") or 1))
+        end_line = params.get("end_line")
+        end_line = int(end_line) if end_line is not None else None
+        max_bytes = min(int(params.get("max_bytes") or READ_FILE_DEFAULT_MAX_BYTES), READ_FILE_MAX_BYTES)
+    except (TypeError, ValueError) as e:
+        return f"Error: invalid line range or max_bytes: {e}"
+
+    lines = ArtifactStore(artifact_directory(work_tree.ctx.cwd)).iter_lines(handle)
+    if lines is None:
+        return f"Error: No stored tool result with handle {handle}"
+
+    selected = []
+    size = 0
+    total_lines = 0
+    truncated = False
+    cut_line = False
+    for line_number, line in enumerate(lines, 1):
+        total_lines = line_number
+        if line_number < start_line or (end_line is not None and line_number > end_line) or truncated:
+            continue
+        line_size = len(line.encode('utf-8'))
+        if size + line_size > max_bytes:
+            truncated = True
+            if not selected:
+                # A single overlong line, e.g. a JSON result, return its head
+                selected.append(line.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore'))
+                cut_line = True
+            continue
+        selected.append(line)
+        size += line_size
+
+    if start_line > total_lines:
+        return f"Error: start_line {start_line} is past the end of the result ({total_lines} lines)"
+    last_line = start_line + len(selected) - 1
+    header = f"[artifact {handle}: lines {start_line}-{last_line} of {total_lines}"
+    if cut_line:
+        header += f"; line {last_line} is longer than max_bytes and was cut at {max_bytes} bytes"
+        if last_line < total_lines:
+            header += f", continue with start_line={last_line + 1}"
+    elif truncated:
+        header += f"; truncated at max_bytes={max_bytes}, continue with start_line={last_line + 1}"
+    elif last_line < total_lines:
+        header += f"; more lines follow from start_line={last_line + 1}"
+    return header + "]\n" + "".join(selected)
@@ -1,12 +1,14 @@
-import subprocess
 from typing import Dict, Any, List
+from geminicode.config import (SEARCH_CONTEXT_LINES, SEARCH_MAX_MATCHES_PER_FILE, SEARCH_MAX_MATCHES,
+                               SEARCH_MAX_LINE_LENGTH)
 from geminicode.work_tree.tree import WorkTree # Assuming WorkTree might be needed later or for consistency
+from geminicode.work_tree.search import SearchError, search_literal, search_regex, search_tokens, search_lines
 
 def expression_search_tool() -> Dict[str, Any]:
     """Tool definition for searching for an expression in files and returning file paths."""
     return {
         "name": "expression_search",
-        "description": "Search for an expression (literal string or regex) in files using ripgrep (rg) and return a list of matching file paths. It runs `rg -l 'search_expression'`. For literal searches (is_regex=False, default), the tool uses ripgrep's fixed string option (`-F`), so you do not need to escape regex characters in the 'expression' string itself. Ensure the expression argument is correctly passed. When using the output files, please make sure to use their FULL PATH.",
+        "description": "Search for an expression (literal string, regex or token query) in the project files and return a list of matching file paths, or with output_mode='lines' the matching lines with line numbers and surrounding context. All searches are answered from the project index. For literal searches (is_regex=False, default), you do not need to escape regex characters in the 'expression' string itself. Regexes use Python `re` syntax and are matched per file in multiline mode, so ^ and $ anchor at the start and end of each line. Ensure the expression argument is correctly passed. When using the output files, please make sure to use their FULL PATH.",
         "parameters": {
             "type": "object",
             "properties": {
@@ -16,7 +18,28 @@ def expression_search_tool() -> Dict[str, Any]:
                 },
                 "is_regex": {
                     "type": "boolean",
-                    "description": "Whether the expression is a regex. Defaults to false (literal string search)."
+                    "description": "Whether the expression is a regex (Python re syntax). Defaults to false (literal string search)."
+                },
+                "is_token_query": {
+                    "type": "boolean",
+                    "description": "Treat the expression as a full-text token query (words, \"exact phrase\", prefix*, AND/OR/NOT, NEAR) and return files ranked by relevance. Case-insensitive, matches whole identifiers. Defaults to false."
+                },
+                "output_mode": {
+                    "type": "string",
+                    "enum": ["files", "lines"],
+                    "description": "'files' (default) returns matching file paths. 'lines' returns each match as FULL PATH, then LINE: text with context lines marked LINE- text, which usually makes a follow-up read_file unnecessary."
+                },
+                "context_lines": {
+                    "type": "integer",
+                    "description": f"Lines of context around each match in lines mode. Defaults to {SEARCH_CONTEXT_LINES}."
+                },
+                "max_per_file": {
+                    "type": "integer",
+                    "description": f"Maximum matching lines per file in lines mode. Defaults to {SEARCH_MAX_MATCHES_PER_FILE}."
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": f"Maximum matching lines in total in lines mode; the search stops once reached. Defaults to {SEARCH_MAX_MATCHES}."
                 }
             },
             "required": ["expression"]
@@ -27,65 +50,76 @@ def expression_search_tool_handler(work_tree: WorkTree, params: Dict[str, Any])
     """Handler for searching for an expression in files.
     
     Args:
-        work_tree: The WorkTree instance (used to get the cwd for the search).
+        work_tree: The WorkTree instance whose project index is searched.
         params: Dictionary containing the parameters for the tool
             - expression: The string or regex to search for.
             - is_regex: Boolean indicating if the expression is a regex (default: False).
+            - is_token_query: Boolean indicating a ranked full-text token query (default: False).
+            - output_mode: "files" (default) or "lines".
+            - context_lines, max_per_file, max_results: Limits for lines mode.
             
     Returns:
-        str: A string containing a list of matching file paths (one per line), 
-             or an error message if the command fails or no expression is provided.
+        str: A string containing a list of matching file paths (one per line), or
+             matching lines grouped by file in lines mode, or an error message if
+             the search fails or no expression is provided.
     """
     expression = params.get("expression")
     if not expression:
         return "Error: Expression parameter is required"
 
     is_regex = params.get("is_regex", False) # Default to False if not provided
-    
-    # Determine the directory to search in
-    search_dir = None
-    if work_tree and hasattr(work_tree, 'ctx') and hasattr(work_tree.ctx, 'cwd'):
-        search_dir = work_tree.ctx.cwd
 
     try:
-        command_parts = ['rg', '--color=never', '--files-with-matches'] # Use --files-with-matches which is equivalent to -l
-        if not is_regex:
-            command_parts.append('--fixed-strings') # -F, --fixed-strings: Treat the pattern as a literal string
-        
-        command_parts.append(expression)
-        
-        # Explicitly add the directory to search if available
-        if search_dir:
-             command_parts.append(search_dir)
-        else:
-            # If no directory context, inform the user or rely on rg's default behavior (current dir)
-             print("Warning: No search directory context provided via WorkTree. Searching from current working directory.")
+        if params.get("output_mode") == "lines":
+            mode = "tokens" if params.get("is_token_query", False) else "regex" if is_regex else "literal"
+            return _search_lines(work_tree, expression, mode, params)
+        if params.get("is_token_query", False):
+            return _format_paths(search_tokens(work_tree, expression))
+        if is_regex:
+            return _format_paths(search_regex(work_tree, expression))
+        return _format_paths(search_literal(work_tree, expression))
+    except SearchError as e:
+        return f"Error: {str(e)}"
+    except Exception as e:
+        return f"Error running search: {str(e)}"
 
 
-        # Using shell=False is generally safer, passing args as a list
-        process = subprocess.Popen(command_parts, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=search_dir) # Pass explicit cwd if available
-        stdout, stderr = process.communicate()
-        
-        if process.returncode == 0:
-            if stdout:
-                return stdout # Returns a string, with each file path on a new line
-            else:
-                # rg returns 0 even if no matches, but stdout will be empty
-                return "No files found matching the expression."
-        elif process.returncode == 1: # rg returns 1 if no matches are found
-             return "No files found matching the expression."
-        else:
-             # rg returns 2 for actual errors (e.g., directory not found)
-             # Include stderr for better diagnostics
-             error_message = f"Error: Command failed with return code {process.returncode}"
-             if stderr:
-                 error_message += f"\nStderr: {stderr.strip()}"
-             if stdout: # Sometimes rg might print partial info to stdout even on error
-                 error_message += f"\nStdout: {stdout.strip()}"
-             return error_message
-            
-    except FileNotFoundError:
-        return "Error: ripgrep (rg) command not found. Please ensure it is installed and in your PATH."
-    except Exception as e:
-        return f"Error running command: {str(e)}"
+def _format_paths(paths: List[str]) -> str:
+    if not paths:
+        return "No files found matching the expression."
+    return "\n".join(paths) + "\n"
+
+
+def _search_lines(work_tree: WorkTree, expression: str, mode: str, params: Dict[str, Any]) -> str:
+    try:
+        context_lines = max(int(params.get("context_lines") if params.get("context_lines") is not None
+                                else SEARCH_CONTEXT_LINES), 0)
+        max_per_file = max(int(params.get("max_per_file") or SEARCH_MAX_MATCHES_PER_FILE), 1)
+        max_results = max(int(params.get("max_results") or SEARCH_MAX_MATCHES), 1)
+    except (TypeError, ValueError) as e:
+        return f"Error: invalid context_lines, max_per_file or max_results: {e}"
+
+    output = []
+    files = matches = 0
+    for result in search_lines(work_tree, expression, mode, context_lines, max_per_file, max_results):
+        files += 1
+        matches += result.matches
+        output.append(result.path)
+        previous = None
+        for number, text, is_match in result.lines:
+            if previous is not None and number > previous + 1:
+                output.append("--")
+            if len(text) > SEARCH_MAX_LINE_LENGTH:
+                text = text[:SEARCH_MAX_LINE_LENGTH] + "..."
+            output.append(f"{number}{':' if is_match else '-'} {text}")
+            previous = number
+        if result.truncated:
+            output.append("(more matches in this file not shown)")
+        output.append("")
 
+    if not files:
+        return "No matches found for the expression."
+    footer = f"[{matches} matching line{'s' if matches != 1 else ''} in {files} file{'s' if files != 1 else ''}"
+    if matches >= max_results:
+        footer += f"; reached max_results={max_results}, narrow the expression or raise max_results for more"
+    return "\n".join(output) + footer + "]\n"
@@ -0,0 +1,73 @@
+from typing import Dict, Any
+from geminicode.work_tree.tree import WorkTree
+from geminicode.work_tree.search import find_definitions, find_references
+
+
+def find_symbol_tool() -> Dict[str, Any]:
+    """Tool definition for looking up where a symbol is defined and used."""
+    return {
+        "name": "find_symbol",
+        "description": "Find where a function, class, method, type or variable is defined and/or used, using the project's symbol index. Returns FULL PATH:line for each definition (with its kind and enclosing class) and each reference (with the line's text). Prefer this over expression_search when looking for a named symbol.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "name": {
+                    "type": "string",
+                    "description": "The exact symbol name, e.g. process_data or UserService (no module prefix)."
+                },
+                "scope": {
+                    "type": "string",
+                    "enum": ["definitions", "references", "all"],
+                    "description": "What to return. Defaults to all."
+                },
+                "max_references": {
+                    "type": "integer",
+                    "description": "Maximum number of references to return. Defaults to 50."
+                }
+            },
+            "required": ["name"]
+        }
+    }
+
+
+def find_symbol_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
+    """Handler for looking up a symbol in the symbol index.
+
+    Args:
+        work_tree: The WorkTree instance containing the database connection
+        params: Dictionary containing the parameters for the tool
+            - name: The symbol name to look up
+            - scope: "definitions", "references" or "all" (default: "all")
+            - max_references: Maximum number of references to return (default: 50)
+
+    Returns:
+        str: Definitions and references, one per line, or an error message
+    """
+    name = params.get("name")
+    if not name:
+        return "Error: name parameter is required"
+    scope = params.get("scope") or "all"
+    max_references = int(params.get("max_references") or 50)
+
+    try:
+        sections = []
+        pending = work_tree.pending_index_rows()
+        if pending:
+            sections.append(f"Note: the symbol index is still being built ({pending} files pending), results may be incomplete.")
+
+        if scope in ("definitions", "all"):
+            definitions = find_definitions(work_tree, name)
+            lines = [f"{path}:{line} {kind} {container + '.' if container else ''}{name}"
+                     for path, line, kind, container in definitions]
+            sections.append(f"Definitions of {name} ({len(lines)}):\n" + ("\n".join(lines) or "None found"))
+
+        if scope in ("references", "all"):
+            references = find_references(work_tree, name, max_references)
+            lines = [f"{path}:{line}: {text}" for path, line, text in references]
+            header = f"References to {name} ({len(lines)}{'+' if len(lines) >= max_references else ''}):\n"
+            sections.append(header + ("\n".join(lines) or "None found"))
+
+        return "\n\n".join(sections)
+
+    except Exception as e:
+        return f"Error looking up symbol: {str(e)}"
@@ -1,63 +1,113 @@
-from typing import Dict, Any, List
+from typing import Dict, Any
+import os
+from geminicode.config import LIST_FILES_PAGE_SIZE, LIST_FILES_MAX_PAGE_SIZE
 from geminicode.work_tree.tree import WorkTree
-import subprocess
+from geminicode.work_tree.listing import list_entries, summarize_directories, format_size
 
 def list_files_tool() -> Dict[str, Any]:
-    """Tool definition for listing all files in the project database."""
+    """Tool definition for listing files in the project database."""
     return {
         "name": "list_files",
-        "description": "List all files stored in the project database",
+        "description": "List files stored in the project database, optionally below a directory, filtered by a glob, limited in depth, or summarized per directory (file counts and sizes). Results are paginated; a footer tells you the offset of the next page.",
         "parameters": {
             "type": "object",
-            "properties": {},  # No parameters needed
+            "properties": {
+                "directory": {
+                    "type": "string",
+                    "description": "Only list files below this directory (full path or relative to the project root). Defaults to the project root."
+                },
+                "pattern": {
+                    "type": "string",
+                    "description": "Gitignore-style glob relative to directory. '*.py' matches at any depth, 'src/**/test_*.py' is anchored to directory."
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "description": "Show files at most this many levels below directory; deeper files are folded into their directory with a count and size."
+                },
+                "summary": {
+                    "type": "boolean",
+                    "description": "Return per-directory file counts and total sizes instead of file paths, grouped max_depth levels deep (default 1). Use this first on large projects."
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "Number of entries to skip, for pagination. Defaults to 0."
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": f"Maximum entries to return. Defaults to {LIST_FILES_PAGE_SIZE}, at most {LIST_FILES_MAX_PAGE_SIZE}."
+                }
+            },
             "required": []
         }
     }
 
 def list_files_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
-    """Handler for listing all files in the project database and cleaning up stale entries.
-    
+    """Handler for listing files in the project database.
+
+    Stale rows are cleaned up incrementally: only the entries of the returned
+    page are checked on disk, and any that are gone are dropped from the index.
+
     Args:
         work_tree: The WorkTree instance containing the database connection
-        params: Dictionary containing the parameters for the tool (empty in this case)
-            
+        params: Dictionary containing the parameters for the tool
+            - directory: Optional directory to list below
+            - pattern: Optional gitignore-style glob
+            - max_depth: Optional depth limit
+            - summary: Per-directory counts and sizes instead of paths
+            - offset, limit: Pagination
+
     Returns:
-        str: A formatted string containing all file paths, or an error message
+        str: One entry per line followed by a pagination footer, or an error message
     """
+    root = os.path.abspath(work_tree.ctx.cwd)
+    directory = os.path.join(root, params.get("directory") or "")
+    directory = os.path.abspath(directory).rstrip(os.sep) + os.sep
+    pattern = params.get("pattern") or None
     try:
-        # Get all files from filesystem using find command
-        result = subprocess.run(['find', work_tree.ctx.cwd], 
-                              capture_output=True, text=True, check=True)
-        fs_file_paths_set = set(result.stdout.strip().split('\n'))
-        
-        # Get all files from database
-        cursor = work_tree.conn.cursor()
-        cursor.execute("SELECT path FROM project_files")
-        db_files = cursor.fetchall()
-        
-        db_file_paths_set = set()
-        for file in db_files:
-            db_file_paths_set.add(file[0])
-        
-        stale_files = []
-        for file in db_file_paths_set:
-            if file not in fs_file_paths_set:
-                db_file_paths_set.remove(file)
-                stale_files.append(file)
-
-        # Remove stale files from database
-        if stale_files:
-            placeholders = ','.join('?' * len(stale_files))
-            cursor.execute(f"DELETE FROM project_files WHERE path IN ({placeholders})", 
-                         tuple(stale_files))
-            work_tree.conn.commit()
-        
-        valid_files = list(db_file_paths_set)
-        if not valid_files:
-            return "No files found in the database"
-            
-        # Format the results as a numbered list
-        return "\n".join(valid_files)
-            
-    except subprocess.CalledProcessError as e:
-        return f"Error running the list_files tool: {str(e)}"
\ No newline at end of file
+        max_depth = params.get("max_depth")
+        max_depth = int(max_depth) if max_depth is not None else None
+        offset = int(params.get("offset") or 0)
+        limit = params.get("limit")
+        limit = min(int(limit), LIST_FILES_MAX_PAGE_SIZE) if limit is not None else LIST_FILES_PAGE_SIZE
+    except (TypeError, ValueError) as e:
+        return f"Error: invalid max_depth, offset or limit: {e}"
+    if max_depth is not None and max_depth < 1:
+        return "Error: max_depth must be at least 1"
+    if offset < 0:
+        return f"Error: invalid offset {offset}, it must be at least 0"
+    if limit < 1:
+        return f"Error: invalid limit {limit}, it must be at least 1"
+
+    if params.get("summary"):
+        entries = summarize_directories(work_tree, directory, pattern, max_depth or 1)
+    else:
+        entries = list_entries(work_tree, directory, pattern, max_depth)
+    total = len(entries)
+    page = entries[offset:offset + limit]
+
+    stale = [entry.path for entry in page
+             if not (os.path.isdir(entry.path) if entry.is_dir else os.path.isfile(entry.path))]
+    if stale:
+        work_tree.apply_changes(stale)
+        stale = set(stale)
+        page = [entry for entry in page if entry.path not in stale]
+
+    if not page:
+        if total and offset >= total:
+            return f"No entries past offset {offset} ({total} in total)"
+        return f"No files found in the database below {directory}"
+
+    lines = []
+    for entry in page:
+        if entry.is_dir:
+            lines.append(f"{entry.path} ({entry.files} file{'s' if entry.files != 1 else ''}, "
+                         f"{format_size(entry.size)})")
+        else:
+            lines.append(entry.path)
+    footer = f"[Entries {offset + 1}-{offset + len(page)} of {total}"
+    if stale:
+        footer += f"; dropped {len(stale)} stale entr{'ies' if len(stale) != 1 else 'y'} from the index"
+    if offset + limit < total:
+        footer += f"; next page: offset={offset + limit}"
+    lines.append(footer + "]")
+    return "\n".join(lines)
@@ -1,17 +1,38 @@
 from typing import Dict, Any
+from geminicode.config import READ_FILE_DEFAULT_MAX_BYTES, READ_FILE_MAX_BYTES, READ_FILE_AROUND_LINES
 from geminicode.work_tree.tree import WorkTree
 
 def read_file_tool() -> Dict[str, Any]:
     """Tool definition for reading file content from the project database."""
     return {
         "name": "read_file",
-        "description": "Read the content of a file from the project database. Only read file if you are unable to find relevent context about it from the cached context",
+        "description": "Read the content of a file from the project database. Only read file if you are unable to find relevent context about it from the cached context. Large files are returned in slices: read only the lines you need with start_line/end_line or around_line. A header reports the total line count and how to continue when the result is partial.",
         "parameters": {
             "type": "object",
             "properties": {
                 "file_path": {
                     "type": "string",
                     "description": "The full path to the file to read"
+                },
+                "start_line": {
+                    "type": "integer",
+                    "description": "First line to return (1-based, inclusive). Defaults to 1."
+                },
+                "end_line": {
+                    "type": "integer",
+                    "description": "Last line to return (1-based, inclusive). Defaults to the end of the file."
+                },
+                "around_line": {
+                    "type": "integer",
+                    "description": "Return the lines around this line instead of start_line/end_line, e.g. a line number from find_symbol or expression_search."
+                },
+                "context_lines": {
+                    "type": "integer",
+                    "description": f"Lines to show on each side of around_line. Defaults to {READ_FILE_AROUND_LINES}."
+                },
+                "max_bytes": {
+                    "type": "integer",
+                    "description": f"Maximum bytes of content to return. Defaults to {READ_FILE_DEFAULT_MAX_BYTES}, at most {READ_FILE_MAX_BYTES}."
                 }
             },
             "required": ["file_path"]
@@ -25,23 +46,55 @@ def read_file_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
         work_tree: The WorkTree instance containing the database connection
         params: Dictionary containing the parameters for the tool
             - file_path: The full path to the file to read
+            - start_line, end_line: Optional 1-based inclusive line range
+            - around_line, context_lines: Optional line to center the slice on
+            - max_bytes: Optional cap on the returned content
             
     Returns:
-        str: The content of the file if found, or an error message if not found
+        str: The content of the file, prefixed with a header when only part of it
+            is returned, or an error message if not found
     """
     file_path = params.get("file_path")
     if not file_path:
         return "Error: file_path parameter is required"
 
     try:
-        cursor = work_tree.conn.cursor()
-        cursor.execute("SELECT content FROM project_files WHERE path = ?", (file_path,))
-        result = cursor.fetchone()
-        
-        if result:
-            return result[0]
-        else:
-            return f"Error: File not found in database: {file_path}"
-            
+        start_line = int(params.get("start_line") or 1)
+        end_line = params.get("end_line")
+        end_line = int(end_line) if end_line is not None else None
+        if params.get("around_line") is not None:
+            around_line = int(params["around_line"])
+            context_lines = params.get("context_lines")
+            context_lines = int(context_lines) if context_lines is not None else READ_FILE_AROUND_LINES
+            if context_lines < 0:
+                return f"Error: invalid context_lines {context_lines}, it must be at least 0"
+            start_line, end_line = around_line - context_lines, around_line + context_lines
+        max_bytes = min(int(params.get("max_bytes") or READ_FILE_DEFAULT_MAX_BYTES), READ_FILE_MAX_BYTES)
+    except (TypeError, ValueError) as e:
+        return f"Error: invalid line range or max_bytes: {e}"
+    if end_line is not None and end_line < start_line:
+        return "Error: end_line must be >= start_line"
+
+    try:
+        result = work_tree.read_file_range(file_path, start_line, end_line, max_bytes)
     except Exception as e:
         return f"Error reading file from database: {str(e)}"
+
+    if result is None:
+        return f"Error: File not found in database: {file_path}"
+    if result.complete:
+        return result.text
+    if result.start_line > result.total_lines:
+        return (f"Error: start_line {result.start_line} is past the end of {file_path} "
+                f"({result.total_lines} lines)")
+
+    header = (f"[Lines {result.start_line}-{result.end_line} of {result.total_lines} in {file_path} "
+              f"({result.size} bytes total)")
+    if result.cut_line:
+        header += f"; line {result.end_line} is longer than max_bytes and was cut at {max_bytes} bytes"
+    elif result.truncated:
+        header += (f"; truncated at max_bytes={max_bytes}, "
+                   f"continue with start_line={result.end_line + 1}")
+    elif result.end_line < result.total_lines:
+        header += f"; more lines follow from start_line={result.end_line + 1}"
+    return header + "]\n" + result.text
@@ -1,48 +1,78 @@
-
-import subprocess
 from typing import Dict, Any
+from geminicode.config import (RUN_CLI_TIMEOUT_SECONDS, RUN_CLI_MAX_TIMEOUT_SECONDS, RUN_CLI_KILL_GRACE_SECONDS,
+                               RUN_CLI_CAPTURE_HEAD_BYTES, RUN_CLI_CAPTURE_TAIL_BYTES)
+from geminicode.console.console import ConsoleWrapper
+from geminicode.utils.process import run_command
 from geminicode.work_tree.tree import WorkTree
 
 def run_cli_tool() -> Dict[str, Any]:
     """Tool definition for running a CLI command and capturing its output."""
     return {
         "name": "run_cli",
-        "description": "Run a CLI command and return the output. IMPORTANT: Always ask permission before running a CLI command. Do not ask to run commands that have a long running time. If you are unsure, ask the user to confirm.",
+        "description": f"Run a CLI command in the project directory and return its exit status, elapsed time and output. Long outputs keep only their beginning and end. Commands are stopped after timeout_seconds (default {RUN_CLI_TIMEOUT_SECONDS}). IMPORTANT: Always ask permission before running a CLI command. If you are unsure, ask the user to confirm.",
         "parameters": {
             "type": "object",
             "properties": {
                 "command": {
                     "type": "string",
                     "description": "The CLI command to execute."
+                },
+                "timeout_seconds": {
+                    "type": "integer",
+                    "description": f"Seconds to wait before stopping the command. Defaults to {RUN_CLI_TIMEOUT_SECONDS}, at most {RUN_CLI_MAX_TIMEOUT_SECONDS}."
                 }
             },
             "required": ["command"]
         }
     }
 
-def run_cli_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
+async def run_cli_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
     """Handler for running a CLI command and capturing its output.
+
+    The command runs as an asyncio subprocess in its own process group, so the
+    event loop keeps going while it runs and its output is streamed to the
+    console live. On timeout the group gets SIGTERM, then SIGKILL.
     
     Args:
-        work_tree: The WorkTree instance (not directly used in this handler).
+        work_tree: The WorkTree instance, its project root is the working directory.
         params: Dictionary containing the parameters for the tool
             - command: The CLI command to execute
+            - timeout_seconds: Optional timeout
             
     Returns:
-        str: The output of the CLI command, or an error message if the command fails
+        str: A status line (exit code, elapsed time, timeout) followed by the
+            bounded stdout/stderr, or an error message if the command can't start
     """
     command = params.get("command")
     if not command:
         return "Error: Command parameter is required"
+    try:
+        timeout = params.get("timeout_seconds")
+        timeout = float(timeout) if timeout is not None else RUN_CLI_TIMEOUT_SECONDS
+    except (TypeError, ValueError) as e:
+        return f"Error: invalid timeout_seconds: {e}"
+    if not timeout > 0:
+        return f"Error: invalid timeout_seconds: {timeout:g}, it must be greater than 0"
+    timeout = min(timeout, RUN_CLI_MAX_TIMEOUT_SECONDS)
 
+    console = ConsoleWrapper()
     try:
-        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        stdout, stderr = process.communicate()
-        
-        if process.returncode == 0:
-            return stdout
-        else:
-            return f"Error: Command failed with return code {process.returncode}\nStdout: {stdout}\nStderr: {stderr}"
-            
+        result = await run_command(command, timeout, RUN_CLI_KILL_GRACE_SECONDS,
+                                   RUN_CLI_CAPTURE_HEAD_BYTES, RUN_CLI_CAPTURE_TAIL_BYTES,
+                                   cwd=work_tree.ctx.cwd, on_output=console.print_cli_output)
     except Exception as e:
         return f"Error running command: {str(e)}"
+
+    if result.timed_out:
+        status = f"timed out after {timeout:g}s and was stopped"
+    elif result.signal_name:
+        status = f"killed by {result.signal_name}"
+    else:
+        status = f"exit code {result.exit_code}"
+    sections = [f"[{status} | elapsed {result.elapsed:.2f}s | "
+                f"stdout {result.stdout.total} bytes | stderr {result.stderr.total} bytes]"]
+    if result.stdout.total:
+        sections.append("Stdout:\n" + result.stdout.text())
+    if result.stderr.total:
+        sections.append("Stderr:\n" + result.stderr.text())
+    return "\n".join(sections)
@@ -2,8 +2,11 @@ from geminicode.tools.expression_search_tool import expression_search_tool, expr
 from geminicode.tools.create_file_tool import create_file_tool, create_file_tool_handler
 from geminicode.tools.read_file_tool import read_file_tool, read_file_tool_handler
 from geminicode.tools.write_file_tool import write_file_tool, write_file_tool_handler
+from geminicode.tools.edit_file_tool import edit_file_tool, edit_file_tool_handler
 from geminicode.tools.list_files_tool import list_files_tool, list_files_tool_handler
 from geminicode.tools.run_cli_tool import run_cli_tool, run_cli_tool_handler
+from geminicode.tools.find_symbol_tool import find_symbol_tool, find_symbol_tool_handler
+from geminicode.tools.expand_artifact_tool import expand_artifact_tool, expand_artifact_tool_handler
 
 
 class ToolHandler:
@@ -13,16 +16,25 @@ class ToolHandler:
             "create_file": create_file_tool_handler,
             "read_file": read_file_tool_handler,
             "write_file": write_file_tool_handler,
+            "edit_file": edit_file_tool_handler,
             "list_files": list_files_tool_handler,
-            "run_cli": run_cli_tool_handler
+            "run_cli": run_cli_tool_handler,
+            "find_symbol": find_symbol_tool_handler,
+            "expand_artifact": expand_artifact_tool_handler
         }
         
         
+        # Tools that only read the index, so several calls in one response can run at once
+        self.concurrent_tools = {"expression_search", "read_file", "list_files", "find_symbol", "expand_artifact"}
+
         self.tools = [
             expression_search_tool(),
             create_file_tool(),
             read_file_tool(),
             write_file_tool(),
+            edit_file_tool(),
             list_files_tool(),
-            run_cli_tool()
+            run_cli_tool(),
+            find_symbol_tool(),
+            expand_artifact_tool()
         ]
\ No newline at end of file
@@ -6,7 +6,7 @@ def write_file_tool() -> Dict[str, Any]:
     """Tool definition for writing content to a file and updating the project database."""
     return {
         "name": "write_file",
-        "description": "Write content to a file and update the project database",
+        "description": "Write content to a file and update the project database. Replaces the whole file; to change part of an existing file use edit_file instead",
         "parameters": {
             "type": "object",
             "properties": {
@@ -50,16 +50,7 @@ def write_file_tool_handler(work_tree: WorkTree, params: Dict[str, Any]) -> str:
             f.write(content)
             
         # Update the database
-        cursor = work_tree.conn.cursor()
-        cursor.execute("""
-            INSERT INTO project_files (path, content, last_modified)
-            VALUES (?, ?, strftime('%s', 'now'))
-            ON CONFLICT(path) DO UPDATE SET
-                content = excluded.content,
-                last_modified = strftime('%s', 'now')
-        """, (file_path, content))
-        
-        work_tree.conn.commit()
+        work_tree.save_to_db(file_path, content)
         return f"Successfully wrote content to {file_path}"
             
     except Exception as e:
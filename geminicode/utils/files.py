@@ -1,20 +1,46 @@
+import hashlib
 import os
 
 
-def read_file(file_path):
+# Extensions that are never worth decoding as text for the project index
+BINARY_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.tiff', '.psd',
+    '.pdf', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar', '.jar', '.war',
+    '.so', '.dylib', '.dll', '.exe', '.o', '.a', '.lib', '.bin', '.class', '.pyc', '.pyo',
+    '.whl', '.egg', '.woff', '.woff2', '.ttf', '.otf', '.eot',
+    '.mp3', '.mp4', '.mov', '.avi', '.wav', '.flac', '.ogg', '.webm',
+    '.db', '.sqlite', '.sqlite3', '.parquet', '.npy', '.npz', '.pkl',
+}
+
+
+def is_binary_path(file_path):
+    return os.path.splitext(file_path)[1].lower() in BINARY_EXTENSIONS
+
+
+def read_text_file(file_path):
+    """Read a file for indexing. Returns None for binary or non UTF-8 files instead of printing.
+
+    Files without an extension are indexed too, so a NUL byte near the start is
+    used to tell binaries apart from scripts, Makefiles, Dockerfiles and so on.
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if b'\0' in data[:8192]:
+        return None
     try:
-        # Attempt to open and read the file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            # Process content
-        return content
+        return data.decode('utf-8')
     except UnicodeDecodeError:
-        print(f"Skipping file with encoding issues: {file_path}")
-    except Exception as e:
-        print(f"Other error processing file {file_path}: {e}")
         return None
 
 
+def hash_content(content):
+    """Stable fingerprint of a file's text, used to detect real content changes."""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
 def write_file(file_path, content):
     with open(file_path, 'w') as file:
         file.write(content)
@@ -34,20 +60,3 @@ def create_file(file_path):
     except Exception as e:
         print(f"Error creating file {file_path}: {e}")
         raise e
-
-
-def get_git_ignore_file(file_path):
-    git_ignore_file = os.path.join(file_path, '.gitignore')
-    if os.path.exists(git_ignore_file):
-        with open(git_ignore_file, 'r') as file:
-            return file.read()
-    return None
-
-
-def get_git_ignore_file_content(file_path):
-    git_ignore_file = get_git_ignore_file(file_path)
-    if git_ignore_file:
-        lines = git_ignore_file.split('\n')
-        # Filter out comments and empty lines
-        return [line for line in lines if line.strip() and not line.strip().startswith('#')]
-    return []
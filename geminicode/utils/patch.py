@@ -0,0 +1,211 @@
+"""Apply model-written edits to file content: search/replace blocks and unified diffs.
+
+Every edit must match the current content exactly. When one doesn't, a
+PatchError explains where it diverged so the model can fix the edit instead
+of resending the whole file. Edits are applied in memory, all or nothing.
+"""
+import re
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+
+class PatchError(Exception):
+    """An edit that does not apply cleanly to the current content."""
+
+
+def _newline(content):
+    return '\r\n' if '\r\n' in content else '\n'
+
+
+def _line_of(content, offset):
+    return content.count('\n', 0, offset) + 1
+
+
+def _split_lines(content):
+    """Lines split on '\n' only, newlines included, like iter_lines in blobs.
+
+    str.splitlines also breaks at form feeds, \x1c-\x1e, \x85 and \u2028/9,
+    which would shift line numbers and rewrite those characters on rejoin.
+    """
+    lines = content.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def _describe_mismatch(content, search):
+    """Point at the place the search text most likely meant, and the first line that differs."""
+    search_lines = search.split('\n')
+    content_lines = content.split('\n')
+    first = next((line.strip() for line in search_lines if line.strip()), None)
+    if first is None:
+        return "the search text is blank"
+    best = None
+    for start, line in enumerate(content_lines):
+        if first not in line:
+            continue
+        offset = next(i for i, text in enumerate(search_lines) if text.strip())
+        start -= offset
+        matched = 0
+        for i, text in enumerate(search_lines):
+            if start + i >= len(content_lines) or content_lines[start + i] != text:
+                break
+            matched += 1
+        if best is None or matched > best[1]:
+            best = (start, matched)
+    if best is None:
+        return f"no line of the file contains {first!r}"
+    start, matched = best
+    index = start + matched
+    expected = search_lines[matched] if matched < len(search_lines) else ''
+    found = content_lines[index] if 0 <= index < len(content_lines) else '<end of file>'
+    if expected.strip() == found.strip():
+        reason = "whitespace differs"
+    else:
+        reason = "text differs"
+    return (f"closest match starts at line {start + 1}, but line {index + 1} {reason}: "
+            f"expected {expected!r}, found {found!r}")
+
+
+def apply_search_replace(content, edits):
+    """Apply a list of {"search", "replace", "replace_all"} edits in order.
+
+    Each search text must occur exactly once unless replace_all is set.
+
+    Returns:
+        (new_content, changed_lines): changed_lines holds the 1-based line each
+            edit applied at.
+    """
+    newline = _newline(content)
+    changed_lines = []
+    for number, edit in enumerate(edits, 1):
+        search = edit.get("search")
+        replace = edit.get("replace", "")
+        if not search:
+            raise PatchError(f"Edit {number}: search text is required")
+        if newline == '\r\n':
+            search = search.replace('\r\n', '\n').replace('\n', '\r\n')
+            replace = replace.replace('\r\n', '\n').replace('\n', '\r\n')
+        count = content.count(search)
+        if count == 0:
+            raise PatchError(f"Edit {number}: search text not found, {_describe_mismatch(content, search)}")
+        if count > 1 and not edit.get("replace_all"):
+            lines = []
+            position = content.find(search)
+            while position != -1:
+                lines.append(str(_line_of(content, position)))
+                position = content.find(search, position + 1)
+            raise PatchError(f"Edit {number}: search text matches {count} times (lines {', '.join(lines)}); "
+                             f"add surrounding lines to make it unique or set replace_all")
+        position = content.find(search)
+        changed_lines.append(_line_of(content, position))
+        content = content.replace(search, replace) if edit.get("replace_all") else \
+            content[:position] + replace + content[position + len(search):]
+    return content, changed_lines
+
+
+def _parse_hunks(diff):
+    hunks = []
+    current = None
+    targets = 0
+    lines = diff.replace('\r\n', '\n').split('\n')
+    # Blank lines after the last hunk are not empty context lines
+    while lines and not lines[-1]:
+        lines.pop()
+    for line in lines:
+        if line.startswith('+++ '):
+            targets += 1
+            continue
+        if line.startswith('--- ') and current is None or line.startswith(('diff ', 'index ')):
+            continue
+        match = _HUNK_HEADER.match(line)
+        if match:
+            current = {"header": line, "old_start": int(match.group(1)), "old": [], "new": [],
+                       "old_no_newline": False, "new_no_newline": False}
+            hunks.append(current)
+            continue
+        if current is None:
+            if line.strip():
+                raise PatchError(f"Unexpected line before the first @@ hunk header: {line!r}")
+            continue
+        if line.startswith('\\'):
+            # "\ No newline at end of file" applies to the side of the line before it
+            if current.get("last") in ('-', ' '):
+                current["old_no_newline"] = True
+            if current.get("last") in ('+', ' '):
+                current["new_no_newline"] = True
+            continue
+        tag, text = (line[:1], line[1:]) if line else (' ', '')
+        if tag == ' ':
+            current["old"].append(text)
+            current["new"].append(text)
+        elif tag == '-':
+            current["old"].append(text)
+        elif tag == '+':
+            current["new"].append(text)
+        else:
+            raise PatchError(f"Invalid line in hunk {current['header']}: {line!r}")
+        current["last"] = tag
+    if targets > 1:
+        raise PatchError("The diff touches more than one file; send one diff per file")
+    if not hunks:
+        raise PatchError("The diff has no @@ hunks")
+    return hunks
+
+
+def _find_hunk(lines, old, expected_at):
+    """Index where `old` matches exactly, trying the expected position first, then the nearest offset."""
+    if not old:
+        return min(max(expected_at, 0), len(lines))
+    size = len(old)
+    for distance in range(len(lines) + 1):
+        for start in ((expected_at,) if distance == 0 else (expected_at - distance, expected_at + distance)):
+            if 0 <= start <= len(lines) - size and lines[start:start + size] == old:
+                return start
+    return None
+
+
+def apply_unified_diff(content, diff):
+    """Apply a unified diff to `content`; hunks may sit at an offset but must match exactly.
+
+    Returns:
+        (new_content, changed_lines): changed_lines holds the 1-based first line
+            of each hunk in the new content.
+    """
+    newline = _newline(content)
+    # Lines keep their own endings, so only what the hunks replace is rewritten
+    lines = _split_lines(content)
+    bodies = [line[:-len(newline)] if line.endswith(newline) else line.rstrip('\n') for line in lines]
+    changed_lines = []
+    shift = 0
+    for hunk in _parse_hunks(diff):
+        old, new = hunk["old"], hunk["new"]
+        expected_at = hunk["old_start"] - 1 + shift if old else hunk["old_start"] + shift
+        start = _find_hunk(bodies, old, expected_at)
+        if start is None:
+            mismatch = _describe_mismatch('\n'.join(bodies), '\n'.join(old))
+            raise PatchError(f"Hunk {hunk['header']} does not apply, {mismatch}")
+        end = start + len(old)
+        new_lines = [text + newline for text in new]
+        if end == len(lines):
+            old_ending = newline if not lines or lines[-1].endswith('\n') else ''
+            # With a "\ No newline" marker the new side says how the file ends, without
+            # one the file keeps its ending
+            if hunk["old_no_newline"] or hunk["new_no_newline"]:
+                ending = '' if hunk["new_no_newline"] else newline
+            else:
+                ending = old_ending
+            if not old and not old_ending:
+                lines[-1] += newline
+            if new_lines:
+                new_lines[-1] = new[-1] + ending
+            elif start:
+                lines[start - 1] = bodies[start - 1] + ending
+        lines[start:end] = new_lines
+        bodies[start:end] = new
+        shift += len(new) - len(old)
+        # A hunk deleting the last lines points at the new last line
+        changed_lines.append(max(1, min(start + 1, len(lines))))
+    return "".join(lines), changed_lines
@@ -0,0 +1,133 @@
+"""Run shell commands on the asyncio loop with a timeout and bounded output capture."""
+import asyncio
+import os
+import signal
+import time
+
+
+class OutputCapture:
+    """Keeps the first `head_bytes` and the last `tail_bytes` of a stream, counting the rest."""
+
+    def __init__(self, head_bytes, tail_bytes):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def feed(self, data):
+        self.total += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_bytes:
+                del self.tail[:len(self.tail) - self.tail_bytes]
+
+    @property
+    def omitted(self):
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self):
+        head = self.head.decode('utf-8', errors='replace')
+        tail = self.tail.decode('utf-8', errors='replace')
+        if self.omitted:
+            return f"{head}\n... [{self.omitted} bytes omitted] ...\n{tail}"
+        return head + tail
+
+
+class CommandResult:
+    """Exit status, timing and captured output of a finished command."""
+
+    def __init__(self, command, stdout, stderr):
+        self.command = command
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = None
+        self.timed_out = False
+        self.elapsed = 0.0
+
+    @property
+    def signal_name(self):
+        if self.exit_code is None or self.exit_code >= 0:
+            return None
+        try:
+            return signal.Signals(-self.exit_code).name
+        except ValueError:
+            return f"signal {-self.exit_code}"
+
+    def to_dict(self):
+        return {
+            "exit_code": self.exit_code,
+            "signal": self.signal_name,
+            "timed_out": self.timed_out,
+            "elapsed": round(self.elapsed, 3),
+            "stdout_bytes": self.stdout.total,
+            "stderr_bytes": self.stderr.total,
+        }
+
+
+async def _pump(stream, name, capture, on_output):
+    while True:
+        data = await stream.read(4096)
+        if not data:
+            return
+        capture.feed(data)
+        if on_output:
+            on_output(name, data.decode('utf-8', errors='replace'))
+
+
+def _signal_group(process, sig):
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _stop(process, kill_grace):
+    """SIGTERM the command's process group, then SIGKILL it if it is still running after kill_grace."""
+    _signal_group(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), kill_grace)
+    except asyncio.TimeoutError:
+        _signal_group(process, signal.SIGKILL)
+        await process.wait()
+
+
+async def run_command(command, timeout, kill_grace, head_bytes, tail_bytes, cwd=None, on_output=None):
+    """Run `command` in a shell, streaming its output to on_output(stream_name, text) as it arrives.
+
+    The command gets its own process group so a timeout or cancellation also
+    stops the children it spawned.
+
+    Returns:
+        CommandResult: exit status, elapsed time and bounded stdout/stderr captures.
+    """
+    result = CommandResult(command, OutputCapture(head_bytes, tail_bytes), OutputCapture(head_bytes, tail_bytes))
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_shell(
+        command, cwd=cwd, stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        start_new_session=True)
+    pumps = asyncio.gather(_pump(process.stdout, "stdout", result.stdout, on_output),
+                           _pump(process.stderr, "stderr", result.stderr, on_output))
+    try:
+        # One deadline for the output and the exit, a command may close its pipes long before it ends
+        await asyncio.wait_for(asyncio.shield(asyncio.gather(pumps, process.wait())), timeout)
+    except asyncio.TimeoutError:
+        result.timed_out = True
+        await _stop(process, kill_grace)
+    except asyncio.CancelledError:
+        await _stop(process, kill_grace)
+        pumps.cancel()
+        raise
+    # Grandchildren holding the pipes open could keep the pumps alive after a stop
+    try:
+        await asyncio.wait_for(pumps, kill_grace)
+    except asyncio.TimeoutError:
+        pass
+    result.exit_code = process.returncode
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,10 @@
+"""Local token estimates, for budgets that can't wait for the API's usage_metadata."""
+
+# Average characters per token for code and English prose with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
@@ -0,0 +1,93 @@
+"""Compressed, content-addressed storage for file bodies in the project index.
+
+Bodies are stored once per content hash, compressed with zstd when the
+optional `zstandard` package is installed and with zlib otherwise. The codec
+is stored next to each blob so an index written with one stays readable.
+Ranged reads decompress incrementally and stop at the last line they need.
+"""
+import codecs
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC_RAW = 'raw'
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Compressing tiny files costs more than it saves
+MIN_COMPRESS_SIZE = 128
+
+# Compressed bytes fed to the decompressor per step of a streaming read
+STREAM_CHUNK_SIZE = 16 * 1024
+
+
+def count_lines(content):
+    """Number of lines as read_file numbers them, a trailing newline does not start a new one."""
+    if not content:
+        return 0
+    return content.count('\n') + (0 if content.endswith('\n') else 1)
+
+
+def compress_text(content):
+    """Return (codec, size, lines, data) for a file body, size being the uncompressed byte count."""
+    raw = content.encode('utf-8')
+    lines = count_lines(content)
+    if len(raw) < MIN_COMPRESS_SIZE:
+        return CODEC_RAW, len(raw), lines, raw
+    if zstandard is not None:
+        return CODEC_ZSTD, len(raw), lines, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return CODEC_ZLIB, len(raw), lines, zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decompress_text(codec, data):
+    if codec == CODEC_RAW:
+        return bytes(data).decode('utf-8')
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Index blob is zstd compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    raise ValueError(f"Unknown blob codec: {codec}")
+
+
+def _decompressed_chunks(codec, data):
+    if codec == CODEC_RAW:
+        yield bytes(data)
+    elif codec == CODEC_ZLIB:
+        decompressor = zlib.decompressobj()
+        for offset in range(0, len(data), STREAM_CHUNK_SIZE):
+            yield decompressor.decompress(data[offset:offset + STREAM_CHUNK_SIZE])
+        yield decompressor.flush()
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Index blob is zstd compressed but the zstandard package is not installed")
+        with zstandard.ZstdDecompressor().stream_reader(bytes(data)) as reader:
+            while True:
+                chunk = reader.read(STREAM_CHUNK_SIZE * 4)
+                if not chunk:
+                    break
+                yield chunk
+    else:
+        raise ValueError(f"Unknown blob codec: {codec}")
+
+
+def iter_lines(codec, data):
+    """Yield the lines of a blob, newlines included, decompressing only as far as they are consumed."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    for chunk in _decompressed_chunks(codec, data):
+        pending += decoder.decode(chunk)
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
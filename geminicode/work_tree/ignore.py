@@ -0,0 +1,164 @@
+import os
+import re
+
+
+def _translate(pattern):
+    """Translate one gitignore glob (without negation/anchoring markers) to a regex."""
+    i, n = 0, len(pattern)
+    out = []
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                i += 2
+                if i < n and pattern[i] == '/':
+                    # "**/" matches zero or more leading directories
+                    out.append('(?:.*/)?')
+                    i += 1
+                else:
+                    out.append('.*')
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            start = i + 1
+            if pattern[start:start + 1] in ('!', '^'):
+                start += 1
+            if pattern[start:start + 1] == ']':
+                start += 1
+            end = pattern.find(']', start)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRule:
+    """A single compiled gitignore line, matched against paths relative to its base directory."""
+
+    def __init__(self, line):
+        self.negate = False
+        if line.startswith('!'):
+            self.negate = True
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        self.dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+        anchored = '/' in line
+        line = line.lstrip('/')
+        prefix = '' if anchored else '(?:.*/)?'
+        self.regex = re.compile(prefix + _translate(line))
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.fullmatch(rel_path) is not None
+
+
+def parse_ignore_lines(lines):
+    rules = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line.endswith('\\ '):
+            line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        rules.append(IgnoreRule(line))
+    return rules
+
+
+def read_ignore_file(file_path):
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            return parse_ignore_lines(f)
+    except OSError:
+        return []
+
+
+class IgnoreMatcher:
+    """Gitignore engine for the project root.
+
+    Combines `.git/info/exclude`, every nested `.gitignore` (loaded lazily and
+    cached per directory, deeper files taking precedence) and the always-ignored
+    patterns from `Context.ignored_files`. `walk` prunes ignored directories in
+    place so `os.walk` never descends into them.
+    """
+
+    def __init__(self, root, always_ignored=()):
+        self.root = os.path.abspath(root)
+        self.always_ignored = parse_ignore_lines(always_ignored)
+        self._chains = {}
+
+    def reload(self):
+        """Forget cached .gitignore rules, e.g. after one of them changed."""
+        self._chains.clear()
+
+    def _rule_chain(self, directory):
+        """(base_dir, rules) pairs that apply inside `directory`, from the root down."""
+        chain = self._chains.get(directory)
+        if chain is not None:
+            return chain
+        if directory == self.root:
+            chain = []
+            exclude = read_ignore_file(os.path.join(self.root, '.git', 'info', 'exclude'))
+            if exclude:
+                chain.append((self.root, exclude))
+        else:
+            chain = list(self._rule_chain(os.path.dirname(directory)))
+        rules = read_ignore_file(os.path.join(directory, '.gitignore'))
+        if rules:
+            chain.append((directory, rules))
+        self._chains[directory] = chain
+        return chain
+
+    def _match(self, path, is_dir):
+        """Whether `path` itself matches, assuming its parent directories are not ignored."""
+        rel_root = path[len(self.root) + 1:]
+        if any(rule.matches(rel_root, is_dir) for rule in self.always_ignored):
+            return True
+        ignored = False
+        for base, rules in self._rule_chain(os.path.dirname(path)):
+            rel_path = path[len(base) + 1:]
+            for rule in rules:
+                if rule.matches(rel_path, is_dir):
+                    ignored = not rule.negate
+        return ignored
+
+    def is_ignored(self, path, is_dir=None):
+        """Full check for a single path, including every parent directory."""
+        path = os.path.abspath(path)
+        if path == self.root or not path.startswith(self.root + os.sep):
+            return False
+        if is_dir is None:
+            is_dir = os.path.isdir(path)
+        parts = path[len(self.root) + 1:].split(os.sep)
+        current = self.root
+        for part in parts[:-1]:
+            current = os.path.join(current, part)
+            if self._match(current, True):
+                return True
+        return self._match(path, is_dir)
+
+    def walk(self, start_dir):
+        """os.walk that skips ignored directories and files, yielding (dirpath, dirnames, filenames)."""
+        start_dir = os.path.abspath(start_dir)
+        if self.is_ignored(start_dir, True):
+            return
+        for dirpath, dirnames, filenames in os.walk(start_dir):
+            dirnames[:] = [d for d in dirnames if not self._match(os.path.join(dirpath, d), True)]
+            yield dirpath, dirnames, [f for f in filenames
+                                      if not self._match(os.path.join(dirpath, f), False)]
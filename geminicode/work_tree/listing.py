@@ -0,0 +1,84 @@
+"""Directory listings served from the project index instead of the filesystem.
+
+Rows are range-scanned on idx_path by directory prefix and filtered with
+gitignore-style globs, so listing a subtree costs the size of that subtree.
+"""
+import os
+from geminicode.work_tree.ignore import IgnoreRule
+
+
+class ListingEntry:
+    """A file, or a directory standing in for the files below it."""
+
+    def __init__(self, path, is_dir, size=0, files=1):
+        self.path = path
+        self.is_dir = is_dir
+        self.size = size
+        self.files = files
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def _indexed_files(work_tree, directory):
+    """(path, size) rows below `directory` (ending with a separator), in path order."""
+    upper = directory[:-1] + chr(ord(directory[-1]) + 1)
+    with work_tree.lock:
+        return work_tree.conn.execute(
+            "SELECT path, size FROM project_files WHERE path >= ? AND path < ? ORDER BY path",
+            (directory, upper)).fetchall()
+
+
+def _matching_files(work_tree, directory, pattern):
+    """(relative parts, size) for indexed files below `directory` that match `pattern`."""
+    rule = IgnoreRule(pattern) if pattern else None
+    for path, size in _indexed_files(work_tree, directory):
+        relative = path[len(directory):]
+        if rule is None or rule.matches(relative.replace(os.sep, '/'), False):
+            yield relative.split(os.sep), size
+
+
+def list_entries(work_tree, directory, pattern=None, max_depth=None):
+    """Files below `directory`, with everything deeper than max_depth folded into its directory.
+
+    Args:
+        directory: Absolute directory path ending with a separator.
+        pattern: Optional gitignore-style glob relative to `directory`, e.g. "*.py"
+            (any depth) or "src/**/test_*.py" (anchored).
+        max_depth: Path components shown below `directory`, None for no limit.
+    """
+    entries = []
+    folded = {}
+    for parts, size in _matching_files(work_tree, directory, pattern):
+        if max_depth is None or len(parts) <= max_depth:
+            entries.append(ListingEntry(directory + os.sep.join(parts), False, size))
+            continue
+        folded_path = directory + os.sep.join(parts[:max_depth]) + os.sep
+        entry = folded.get(folded_path)
+        if entry is None:
+            entry = folded[folded_path] = ListingEntry(folded_path, True, 0, 0)
+            entries.append(entry)
+        entry.size += size
+        entry.files += 1
+    return entries
+
+
+def summarize_directories(work_tree, directory, pattern=None, depth=1):
+    """Per-directory file counts and sizes, grouped `depth` levels below `directory`.
+
+    Files directly inside a shallower directory are counted on that directory.
+    """
+    summary = {}
+    for parts, size in _matching_files(work_tree, directory, pattern):
+        key = directory + ''.join(part + os.sep for part in parts[:-1][:depth])
+        entry = summary.get(key)
+        if entry is None:
+            entry = summary[key] = ListingEntry(key, True, 0, 0)
+        entry.size += size
+        entry.files += 1
+    return sorted(summary.values(), key=lambda entry: entry.path)
@@ -0,0 +1,196 @@
+"""A compact map of the project for the model's cached context.
+
+Built from the project index only: key config files, the directory layout and
+the top-level symbols per file, packed into a token budget. Files are ranked
+by how many files reference their symbols and by how shallow they sit, so
+core modules and entry points survive the trim first.
+"""
+import hashlib
+import math
+import os
+from geminicode.utils.tokens import estimate_tokens
+from geminicode.work_tree.listing import format_size, summarize_directories
+
+# Files that say how the project is built, configured and run
+CONFIG_FILE_NAMES = {
+    'pyproject.toml', 'setup.py', 'setup.cfg', 'requirements.txt', 'Pipfile', 'tox.ini', 'noxfile.py',
+    'package.json', 'tsconfig.json', 'deno.json', 'Cargo.toml', 'go.mod', 'pom.xml', 'build.gradle',
+    'build.gradle.kts', 'Gemfile', 'composer.json', 'CMakeLists.txt', 'Makefile', 'Dockerfile',
+    'docker-compose.yml', 'docker-compose.yaml', '.env.example', 'README.md', 'README.rst', 'README',
+}
+CONFIG_FILE_MAX_DEPTH = 2
+
+# Names that usually mark an entry point, ranked up
+ENTRY_POINT_NAMES = {'main', '__main__', '__init__', 'index', 'app', 'cli', 'server', 'lib', 'mod'}
+
+# Symbol kinds worth listing, module-level variables and private names are left out
+MAP_SYMBOL_KINDS = ('class', 'function', 'struct', 'interface', 'trait', 'type', 'enum', 'module')
+MAX_SYMBOLS_PER_FILE = 12
+
+# Share of the budget the directory layout may take, the rest goes to files
+DIRECTORY_BUDGET_SHARE = 0.25
+DIRECTORY_DEPTH = 2
+
+_SYMBOLS_SQL = f"""
+    SELECT p.path, s.name, s.kind FROM symbols s
+    JOIN project_files p ON p.id = s.file_id
+    WHERE s.container IS NULL AND s.kind IN ({', '.join('?' * len(MAP_SYMBOL_KINDS))})
+    ORDER BY p.path, s.line
+"""
+
+# Per file, how many files reference the names of its top-level symbols
+_INBOUND_REFS_SQL = f"""
+    SELECT p.path, sum(n.files) FROM symbols s
+    JOIN project_files p ON p.id = s.file_id
+    JOIN (SELECT name, count(DISTINCT file_id) AS files FROM symbol_refs GROUP BY name) n ON n.name = s.name
+    WHERE s.container IS NULL AND s.kind IN ({', '.join('?' * len(MAP_SYMBOL_KINDS))})
+    GROUP BY p.path
+"""
+
+
+def index_fingerprint(work_tree):
+    """Hash of the file paths and their top-level symbols, a cheap check before building the map.
+
+    Edits inside a function body keep the fingerprint; adding, removing or
+    renaming files or top-level definitions change it.
+    """
+    digest = hashlib.sha1()
+    with work_tree.lock:
+        for (path,) in work_tree.conn.execute("SELECT path FROM project_files ORDER BY path"):
+            digest.update(path.encode('utf-8', errors='replace') + b'\0')
+        digest.update(b'\1')
+        for path, name, kind in work_tree.conn.execute(_SYMBOLS_SQL, MAP_SYMBOL_KINDS):
+            digest.update(f"{path}\0{name}\0{kind}\0".encode('utf-8', errors='replace'))
+    return digest.hexdigest()
+
+
+def _format_symbol(name, kind):
+    if kind == 'function':
+        return f"{name}()"
+    return f"{kind} {name}"
+
+
+def _file_line(relative, symbols):
+    symbols = [(name, kind) for name, kind in symbols if not name.startswith('_')]
+    if not symbols:
+        return relative
+    shown = [_format_symbol(name, kind) for name, kind in symbols[:MAX_SYMBOLS_PER_FILE]]
+    if len(symbols) > MAX_SYMBOLS_PER_FILE:
+        shown.append(f"+{len(symbols) - MAX_SYMBOLS_PER_FILE} more")
+    return f"{relative}: {', '.join(shown)}"
+
+
+def _rank(relative, inbound):
+    parts = relative.split(os.sep)
+    score = math.log1p(inbound) + 2 / len(parts)
+    if os.path.splitext(parts[-1])[0] in ENTRY_POINT_NAMES:
+        score += 1
+    if any(part.startswith('test') or part.endswith(('_test.py', '.test.js', '.spec.ts')) for part in parts):
+        score /= 2
+    return score
+
+
+def _pack(lines, budget):
+    """Leading lines that fit in `budget` tokens, and the tokens they use."""
+    packed = []
+    used = 0
+    for line in lines:
+        tokens = estimate_tokens(line) + 1
+        if used + tokens > budget:
+            break
+        packed.append(line)
+        used += tokens
+    return packed, used
+
+
+def build_repo_map(work_tree, max_tokens):
+    """Markdown map of the project in about `max_tokens` tokens, and a fingerprint of what it shows.
+
+    The fingerprint covers the config files, directories and file lines in
+    the map but not the file counts and sizes, so a new log or a file that
+    does not make it into the map leaves it unchanged.
+    """
+    root = work_tree.ctx.cwd.rstrip(os.sep) + os.sep
+    with work_tree.lock:
+        files = work_tree.conn.execute(
+            "SELECT count(*), coalesce(sum(size), 0) FROM project_files").fetchone()
+        paths = [path for (path,) in work_tree.conn.execute("SELECT path FROM project_files ORDER BY path")]
+        symbol_rows = work_tree.conn.execute(_SYMBOLS_SQL, MAP_SYMBOL_KINDS).fetchall()
+        inbound = dict(work_tree.conn.execute(_INBOUND_REFS_SQL, MAP_SYMBOL_KINDS).fetchall())
+
+    header = [
+        "## Repository map",
+        f"Generated from the project index: {files[0]} files, {format_size(files[1])}. "
+        "Paths are relative to the project path. Use it to decide what to read instead of listing files first.",
+    ]
+    config_files = [path[len(root):] for path in paths
+                    if path.startswith(root) and os.path.basename(path) in CONFIG_FILE_NAMES
+                    and path[len(root):].count(os.sep) < CONFIG_FILE_MAX_DEPTH]
+    if config_files:
+        config_files.sort(key=lambda relative: (relative.count(os.sep), relative))
+        header += ["", "### Key config files", ", ".join(config_files)]
+    budget = max_tokens - sum(estimate_tokens(line) + 1 for line in header)
+
+    directories = summarize_directories(work_tree, root, depth=DIRECTORY_DEPTH)
+    directories.sort(key=lambda entry: -entry.files)
+    directory_lines, used = _pack(
+        [f"{entry.path[len(root):] or './'} ({entry.files} files, {format_size(entry.size)})"
+         for entry in directories],
+        int(max_tokens * DIRECTORY_BUDGET_SHARE))
+    budget -= used
+
+    symbols_by_path = {}
+    for path, name, kind in symbol_rows:
+        if path.startswith(root):
+            symbols_by_path.setdefault(path, []).append((name, kind))
+    ranked = sorted(symbols_by_path, key=lambda path: -_rank(path[len(root):], inbound.get(path, 0)))
+    file_lines, _ = _pack([_file_line(path[len(root):], symbols_by_path[path]) for path in ranked], budget - 20)
+
+    digest = hashlib.sha1()
+    shown = config_files + [entry.path for entry in directories[:len(directory_lines)]] + sorted(file_lines)
+    for line in shown:
+        digest.update(line.encode('utf-8', errors='replace') + b'\0')
+
+    sections = header
+    if directory_lines:
+        sections += ["", "### Directories"] + sorted(directory_lines)
+    if file_lines:
+        sections += ["", "### Files and top-level symbols"] + sorted(file_lines)
+        if len(file_lines) < len(ranked):
+            sections.append(f"... {len(ranked) - len(file_lines)} more files with symbols not shown")
+    return "\n".join(sections), digest.hexdigest()
+
+
+class RepoMap:
+    """The current repo map and the fingerprints it was built from."""
+
+    def __init__(self, work_tree, max_tokens):
+        self.work_tree = work_tree
+        self.max_tokens = max_tokens
+        self.text = ""
+        self.fingerprint = None
+        self.index_fingerprint = None
+
+    def refresh(self):
+        """Rebuild the map if what it shows changed, returns whether it did.
+
+        The map is only rebuilt when the paths or top-level symbols in the
+        index changed, and only replaced when the rebuilt one shows different
+        files or symbols. Once a map exists, it is not rebuilt while the
+        symbol index is still catching up, so a bulk load causes one rebuild
+        instead of many.
+        """
+        if self.max_tokens <= 0:
+            return False
+        if self.fingerprint is not None and self.work_tree.pending_index_rows():
+            return False
+        indexed = index_fingerprint(self.work_tree)
+        if indexed == self.index_fingerprint:
+            return False
+        self.index_fingerprint = indexed
+        text, fingerprint = build_repo_map(self.work_tree, self.max_tokens)
+        if fingerprint == self.fingerprint:
+            return False
+        self.text = text
+        self.fingerprint = fingerprint
+        return True
@@ -0,0 +1,240 @@
+import re
+import sqlite3
+from geminicode.work_tree.blobs import decompress_text
+from geminicode.work_tree.trigrams import literal_trigram_query, regex_trigram_query
+
+
+class SearchError(Exception):
+    """Raised for queries the index can't run, e.g. malformed FTS syntax."""
+
+
+def _candidate_rows(work_tree, trigram_query):
+    """(path, content) rows that can match, narrowed by the trigram index when possible.
+
+    Rows the background builder has not reached yet are always candidates.
+    Bodies are decompressed lazily, one candidate at a time.
+    """
+    if trigram_query is None or not work_tree.has_trigrams:
+        rows = work_tree.conn.execute("""
+            SELECT p.path, b.codec, b.data FROM project_files p
+            JOIN blobs b ON b.hash = p.content_hash
+            ORDER BY p.path
+        """)
+    else:
+        rows = work_tree.conn.execute("""
+            SELECT p.path, b.codec, b.data FROM project_files p
+            JOIN blobs b ON b.hash = p.content_hash
+            WHERE p.id IN (SELECT rowid FROM project_files_trigram WHERE project_files_trigram MATCH ?)
+            UNION ALL
+            SELECT p.path, b.codec, b.data FROM project_files p
+            JOIN blobs b ON b.hash = p.content_hash
+            WHERE p.id > ?
+            ORDER BY 1
+        """, (trigram_query, work_tree.trigram_upto()))
+    for path, codec, data in rows:
+        yield path, decompress_text(codec, data)
+
+
+def search_literal(work_tree, expression):
+    """Paths of indexed files containing `expression` verbatim (case-sensitive).
+
+    The trigram index narrows the candidates to files containing every trigram
+    of the literal, and the exact match is confirmed on the decompressed body.
+    """
+    trigram_query = literal_trigram_query(expression) if work_tree.has_trigrams else None
+    with work_tree.lock:
+        return [path for path, content in _candidate_rows(work_tree, trigram_query)
+                if expression in content]
+
+
+def search_tokens(work_tree, query, limit=200):
+    """Run an FTS5 query (words, "phrases", prefix*, AND/OR/NOT, NEAR) ranked by bm25."""
+    if not work_tree.has_fts:
+        raise SearchError("Token search needs SQLite with FTS5 support")
+    try:
+        with work_tree.lock:
+            rows = work_tree.conn.execute("""
+                SELECT p.path FROM project_files_fts f
+                JOIN project_files p ON p.id = f.rowid
+                WHERE project_files_fts MATCH ?
+                ORDER BY bm25(project_files_fts, 2.0, 1.0)
+                LIMIT ?
+            """, (query, limit))
+            return [row[0] for row in rows]
+    except sqlite3.OperationalError as e:
+        raise SearchError(f"Invalid token query {query!r}: {e}")
+
+
+def search_regex(work_tree, expression):
+    """Paths of indexed files matching a Python regex.
+
+    The regex runs over whole files with re.MULTILINE, so ^ and $ match at
+    line boundaries as they would in a line-based grep. Only files holding the
+    trigrams the regex requires are read and run through the regex, so the
+    work follows the number of candidates, not the repo size.
+    """
+    try:
+        pattern = re.compile(expression, re.MULTILINE)
+        trigram_query = regex_trigram_query(expression)
+    except re.error as e:
+        raise SearchError(f"Invalid regex {expression!r}: {e}")
+    with work_tree.lock:
+        return [path for path, content in _candidate_rows(work_tree, trigram_query)
+                if pattern.search(content)]
+
+
+class FileMatches:
+    """Matching lines of one file, with context, as produced by search_lines.
+
+    lines holds (line_number, text, is_match) tuples in order; a gap in the
+    numbers separates context windows. truncated is set when the per-file cap
+    left further matches out.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lines = []
+        self.matches = 0
+        self.truncated = False
+
+
+def _match_line_numbers(content, pattern, limit):
+    """1-based numbers of the lines where matches start, at most `limit`, and whether more exist."""
+    numbers = []
+    line, position = 1, 0
+    for match in pattern.finditer(content):
+        line += content.count('\n', position, match.start())
+        position = match.start()
+        if numbers and numbers[-1] == line:
+            continue
+        if len(numbers) == limit:
+            return numbers, True
+        numbers.append(line)
+    return numbers, False
+
+
+def _split_lines(content):
+    """Lines split on '\n' only, the way matches are numbered; splitlines also breaks at \r, \x0c or \u2028."""
+    lines = content.split('\n')
+    if content.endswith('\n'):
+        lines.pop()
+    return [line[:-1] if line.endswith('\r') else line for line in lines]
+
+
+def _file_matches(path, content, pattern, context_lines, max_per_file):
+    numbers, truncated = _match_line_numbers(content, pattern, max_per_file)
+    if not numbers:
+        return None
+    result = FileMatches(path)
+    result.matches = len(numbers)
+    result.truncated = truncated
+    content_lines = _split_lines(content)
+    matched = set(numbers)
+    shown = set()
+    for number in numbers:
+        for context in range(max(1, number - context_lines), min(len(content_lines), number + context_lines) + 1):
+            shown.add(context)
+    for number in sorted(shown):
+        result.lines.append((number, content_lines[number - 1], number in matched))
+    return result
+
+
+def _token_pattern(query):
+    """Case-insensitive whole-word pattern for the terms of an FTS query, to locate them in lines."""
+    terms = []
+    for term, prefix in re.findall(r'(\w+)(\*?)', query):
+        if term in ('AND', 'OR', 'NOT', 'NEAR'):
+            continue
+        terms.append(re.escape(term) + (r'\w*' if prefix else ''))
+    if not terms:
+        return None
+    return re.compile(r'(?<!\w)(?:' + '|'.join(terms) + r')(?!\w)', re.IGNORECASE)
+
+
+def search_lines(work_tree, expression, mode='literal', context_lines=2, max_per_file=10, max_results=100):
+    """Yield FileMatches for the matching lines of each file, most relevant or path order.
+
+    mode is 'literal', 'regex' or 'tokens', with the same semantics as the
+    path searches. Candidates are read and scanned one file at a time, so the
+    caller can stop as soon as it has enough; scanning also stops by itself
+    once max_results matching lines were produced.
+    """
+    if mode == 'tokens':
+        pattern = _token_pattern(expression)
+        if pattern is None:
+            raise SearchError(f"Token query {expression!r} has no searchable terms")
+        rows = ((path, work_tree.get_file_content(path)) for path in search_tokens(work_tree, expression))
+    else:
+        if mode == 'regex':
+            try:
+                pattern = re.compile(expression, re.MULTILINE)
+                trigram_query = regex_trigram_query(expression)
+            except re.error as e:
+                raise SearchError(f"Invalid regex {expression!r}: {e}")
+        else:
+            pattern = re.compile(re.escape(expression))
+            trigram_query = literal_trigram_query(expression) if work_tree.has_trigrams else None
+        rows = _candidate_rows(work_tree, trigram_query)
+
+    remaining = max_results
+    with work_tree.lock:
+        for path, content in rows:
+            if content is None:
+                continue
+            result = _file_matches(path, content, pattern, context_lines, min(max_per_file, remaining))
+            if result is None:
+                continue
+            remaining -= result.matches
+            yield result
+            if remaining <= 0:
+                return
+
+
+def find_definitions(work_tree, name):
+    """(path, line, kind, container) for every indexed definition of `name`."""
+    with work_tree.lock:
+        return work_tree.conn.execute("""
+            SELECT p.path, s.line, s.kind, s.container FROM symbols s
+            JOIN project_files p ON p.id = s.file_id
+            WHERE s.name = ?
+            ORDER BY p.path, s.line
+        """, (name,)).fetchall()
+
+
+def find_references(work_tree, name, limit=50):
+    """(path, line, text) for uses of `name`, definitions excluded.
+
+    Python references come from the stored ast-based symbol_refs. Other files
+    have no stored references, so they are found with a whole-word regex over
+    the trigram candidates.
+    """
+    definitions = {(path, line) for path, line, _, _ in find_definitions(work_tree, name)}
+    references = []
+    with work_tree.lock:
+        stored = work_tree.conn.execute("""
+            SELECT p.path, b.codec, b.data, group_concat(r.line) FROM symbol_refs r
+            JOIN project_files p ON p.id = r.file_id
+            JOIN blobs b ON b.hash = p.content_hash
+            WHERE r.name = ?
+            GROUP BY p.id
+            ORDER BY p.path
+        """, (name,)).fetchall()
+    python_paths = set()
+    for path, codec, data, lines in stored:
+        python_paths.add(path)
+        content_lines = _split_lines(decompress_text(codec, data))
+        for line in sorted({int(line) for line in lines.split(',')}):
+            if (path, line) not in definitions and line <= len(content_lines):
+                references.append((path, line, content_lines[line - 1].strip()))
+
+    pattern = re.compile(r'(?<![\w$])' + re.escape(name) + r'(?![\w$])')
+    with work_tree.lock:
+        for path, content in _candidate_rows(work_tree, regex_trigram_query(re.escape(name))):
+            if path in python_paths or path.endswith(('.py', '.pyi')) or not pattern.search(content):
+                continue
+            for line, text in enumerate(_split_lines(content), 1):
+                if pattern.search(text) and (path, line) not in definitions:
+                    references.append((path, line, text.strip()))
+            if len(references) >= limit:
+                break
+    return references[:limit]
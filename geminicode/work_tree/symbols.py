@@ -0,0 +1,182 @@
+"""Symbol extraction for the project index.
+
+Python is parsed with `ast`, which gives exact definitions plus the names each
+line reads (references). Other languages use line-based regexes that only
+recognise definitions; their references are found at query time through the
+search indexes instead of being stored.
+"""
+import ast
+import os
+import re
+
+PYTHON_EXTENSIONS = {'.py', '.pyi'}
+
+_JS_ID = r'[A-Za-z_$][\w$]*'
+_JS = [
+    (rf'^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*({_JS_ID})', 'function'),
+    (rf'^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+({_JS_ID})', 'class'),
+    (rf'^\s*(?:export\s+)?(?:const|let|var)\s+({_JS_ID})\s*(?::[^=]+)?=\s*(?:async\s+)?'
+     rf'(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|{_JS_ID}\s*=>)', 'function'),
+    (rf'^\s*(?:export\s+)?(?:declare\s+)?interface\s+({_JS_ID})', 'interface'),
+    (rf'^\s*(?:export\s+)?(?:declare\s+)?type\s+({_JS_ID})\s*(?:<[^>]*>)?\s*=', 'type'),
+    (rf'^\s*(?:export\s+)?(?:const\s+)?enum\s+({_JS_ID})', 'enum'),
+    (rf'^\s+(?:(?:public|private|protected|static|readonly|async|get|set)\s+)*({_JS_ID})\s*\([^)]*\)\s*(?::[^{{]+)?\{{', 'method'),
+]
+_GO = [
+    (r'^func\s+\([^)]*\)\s*([A-Za-z_]\w*)', 'method'),
+    (r'^func\s+([A-Za-z_]\w*)', 'function'),
+    (r'^type\s+([A-Za-z_]\w*)', 'type'),
+]
+_RUST = [
+    (r'^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+"[^"]*"\s+)?fn\s+([A-Za-z_]\w*)', 'function'),
+    (r'^\s*(?:pub(?:\([^)]*\))?\s+)?struct\s+([A-Za-z_]\w*)', 'struct'),
+    (r'^\s*(?:pub(?:\([^)]*\))?\s+)?enum\s+([A-Za-z_]\w*)', 'enum'),
+    (r'^\s*(?:pub(?:\([^)]*\))?\s+)?(?:unsafe\s+)?trait\s+([A-Za-z_]\w*)', 'trait'),
+    (r'^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+([A-Za-z_]\w*)', 'module'),
+    (r'^\s*(?:pub(?:\([^)]*\))?\s+)?type\s+([A-Za-z_]\w*)', 'type'),
+]
+_JVM = [
+    (r'^\s*(?:(?:public|private|protected|internal|static|final|abstract|sealed|data|open|partial)\s+)*'
+     r'(?:class|interface|enum|record|object|struct)\s+([A-Za-z_]\w*)', 'class'),
+    (r'^\s*(?:(?:public|private|protected|internal|static|final|abstract|override|open|suspend|inline)\s+)*'
+     r'fun\s+(?:<[^>]*>\s*)?(?:[\w.]+\.)?([A-Za-z_]\w*)\s*\(', 'function'),
+    (r'^\s*(?:(?:public|private|protected|internal|static|final|abstract|override|virtual|async|synchronized)\s+)+'
+     r'[\w<>\[\],.?]+\s+([A-Za-z_]\w*)\s*\(', 'method'),
+]
+_C = [
+    (r'^\s*(?:typedef\s+)?(?:struct|union|enum|class|namespace)\s+([A-Za-z_]\w*)\s*(?:final\s*)?[:{]?\s*$', 'type'),
+    (r'^#\s*define\s+([A-Za-z_]\w*)', 'macro'),
+    (r'^(?!\s)(?!(?:if|for|while|switch|return|else)\b)(?:[\w:*&<>,]+\s+)+\**([A-Za-z_][\w:~]*)\s*\([^;]*$', 'function'),
+]
+_RUBY = [
+    (r'^\s*def\s+(?:self\.)?([A-Za-z_]\w*[?!=]?)', 'function'),
+    (r'^\s*class\s+([A-Z]\w*)', 'class'),
+    (r'^\s*module\s+([A-Z]\w*)', 'module'),
+]
+_PHP = [
+    (r'^\s*(?:(?:public|private|protected|static|final|abstract)\s+)*function\s+&?([A-Za-z_]\w*)', 'function'),
+    (r'^\s*(?:(?:final|abstract|readonly)\s+)*(?:class|interface|trait|enum)\s+([A-Za-z_]\w*)', 'class'),
+]
+_SWIFT = [
+    (r'^\s*(?:(?:public|private|fileprivate|internal|open|static|final|override|mutating)\s+)*func\s+([A-Za-z_]\w*)', 'function'),
+    (r'^\s*(?:(?:public|private|fileprivate|internal|open|final)\s+)*(?:class|struct|enum|protocol|extension|actor)\s+([A-Za-z_]\w*)', 'class'),
+]
+_SHELL = [
+    (r'^\s*(?:function\s+)?([A-Za-z_][\w-]*)\s*\(\)\s*\{?', 'function'),
+]
+_PYTHON_FALLBACK = [
+    (r'^\s*(?:async\s+)?def\s+([A-Za-z_]\w*)', 'function'),
+    (r'^\s*class\s+([A-Za-z_]\w*)', 'class'),
+]
+
+_RULES_BY_EXTENSION = {}
+for _extensions, _rules in [
+    (('.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx', '.mts', '.cts'), _JS),
+    (('.go',), _GO),
+    (('.rs',), _RUST),
+    (('.java', '.kt', '.kts', '.scala', '.cs', '.groovy'), _JVM),
+    (('.c', '.h', '.cc', '.cpp', '.cxx', '.hpp', '.hh', '.hxx', '.m', '.mm'), _C),
+    (('.rb', '.rake'), _RUBY),
+    (('.php',), _PHP),
+    (('.swift',), _SWIFT),
+    (('.sh', '.bash', '.zsh'), _SHELL),
+    (('.py', '.pyi'), _PYTHON_FALLBACK),
+]:
+    _compiled = [(re.compile(pattern), kind) for pattern, kind in _rules]
+    for _extension in _extensions:
+        _RULES_BY_EXTENSION[_extension] = _compiled
+
+_NOT_A_METHOD = {'if', 'for', 'while', 'switch', 'catch', 'function', 'return', 'with', 'constructor'}
+
+
+class _PythonSymbolVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.definitions = []
+        self.references = set()
+        self._scopes = []
+
+    def _container(self):
+        return '.'.join(name for name, _ in self._scopes) or None
+
+    def _define(self, node, kind):
+        self.definitions.append((node.name, kind, node.lineno, self._container()))
+
+    def visit_ClassDef(self, node):
+        self._define(node, 'class')
+        self._visit_scope(node, 'class')
+
+    def visit_FunctionDef(self, node):
+        in_class = bool(self._scopes) and self._scopes[-1][1] == 'class'
+        self._define(node, 'method' if in_class else 'function')
+        self._visit_scope(node, 'function')
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _visit_scope(self, node, kind):
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self._scopes.append((node.name, kind))
+        for child in node.body:
+            self.visit(child)
+        self._scopes.pop()
+        for child in ast.iter_child_nodes(node):
+            if child not in node.body and child not in node.decorator_list:
+                self.visit(child)
+
+    def visit_Assign(self, node):
+        # Module and class level constants/attributes, not locals
+        if not self._scopes or self._scopes[-1][1] == 'class':
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.definitions.append((target.id, 'variable', node.lineno, self._container()))
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.references.add((node.id, node.lineno))
+
+    def visit_Attribute(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.references.add((node.attr, node.lineno))
+        self.generic_visit(node)
+
+
+def _regex_symbols(content, rules):
+    definitions = []
+    current_class = None
+    for line_number, line in enumerate(content.splitlines(), 1):
+        for pattern, kind in rules:
+            match = pattern.match(line)
+            if not match:
+                continue
+            name = match.group(1)
+            if kind == 'method' and name in _NOT_A_METHOD:
+                continue
+            top_level = not line[:1].isspace()
+            if top_level and kind in ('class', 'struct', 'interface', 'trait', 'type'):
+                current_class = name
+            container = None if top_level else current_class
+            definitions.append((name, kind, line_number, container))
+            break
+    return definitions
+
+
+def extract_symbols(file_path, content):
+    """Return (definitions, references) for a file.
+
+    definitions: list of (name, kind, line, container) where container is the
+        enclosing class/function path, None for top-level symbols.
+    references: list of (name, line), only produced for Python.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in PYTHON_EXTENSIONS:
+        try:
+            visitor = _PythonSymbolVisitor()
+            visitor.visit(ast.parse(content))
+            return visitor.definitions, sorted(visitor.references)
+        except (SyntaxError, ValueError, RecursionError):
+            pass
+    rules = _RULES_BY_EXTENSION.get(extension)
+    if not rules:
+        return [], []
+    return _regex_symbols(content, rules), []
@@ -1,31 +1,229 @@
 import os
 import sqlite3
+import threading
 import time
-from geminicode.utils.files import get_git_ignore_file_content, read_file
+from concurrent.futures import ThreadPoolExecutor
+from geminicode.config import INDEX_READ_WORKERS, INDEX_WRITE_BATCH_SIZE
+from geminicode.utils.files import read_text_file, hash_content, is_binary_path
+from geminicode.work_tree.blobs import compress_text, decompress_text, iter_lines
+from geminicode.work_tree.ignore import IgnoreMatcher
+from geminicode.work_tree.symbols import extract_symbols
+
+# Bump when the layout of project_files changes. The index is only a cache of the
+# working tree, so an old database is dropped and rebuilt instead of migrated.
+DB_SCHEMA_VERSION = 6
 
-# Corrected DB_SCHEMA (removed trailing comma)
 DB_SCHEMA = """
     CREATE TABLE IF NOT EXISTS project_files (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         path TEXT UNIQUE NOT NULL,
         last_modified REAL NOT NULL,
-        content TEXT NOT NULL
+        size INTEGER NOT NULL DEFAULT 0,
+        mtime REAL NOT NULL DEFAULT 0,
+        content_hash TEXT NOT NULL DEFAULT '',
+        symbols_hash TEXT NOT NULL DEFAULT ''
     );
     CREATE INDEX IF NOT EXISTS idx_path ON project_files (path);
+    CREATE INDEX IF NOT EXISTS idx_content_hash ON project_files (content_hash);
+
+    -- File bodies, stored once per content hash and compressed (see blobs.py).
+    -- project_files.content_hash points here; the body is decompressed on read.
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        codec TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        lines INTEGER NOT NULL,
+        data BLOB NOT NULL
+    );
+    -- Rows whose symbols were extracted from an older version of the content
+    CREATE INDEX IF NOT EXISTS idx_symbols_pending ON project_files (id)
+        WHERE symbols_hash != content_hash;
+
+    CREATE TABLE IF NOT EXISTS symbols (
+        file_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        line INTEGER NOT NULL,
+        container TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols (name);
+    CREATE INDEX IF NOT EXISTS idx_symbols_file ON symbols (file_id);
+    CREATE TABLE IF NOT EXISTS symbol_refs (
+        file_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        line INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_symbol_refs_name ON symbol_refs (name);
+    CREATE INDEX IF NOT EXISTS idx_symbol_refs_file ON symbol_refs (file_id);
+    CREATE TRIGGER IF NOT EXISTS project_files_symbols_delete AFTER DELETE ON project_files BEGIN
+        DELETE FROM symbols WHERE file_id = old.id;
+        DELETE FROM symbol_refs WHERE file_id = old.id;
+    END;
+"""
+
+# Full-text index over project_files. It is contentless, so it keeps no second copy
+# of the bodies, and the triggers keep it in sync on every write. blob_text() is a
+# Python function registered on the connection that decompresses a blob.
+# '_' is a token character so identifiers like process_data stay one token.
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS project_files_fts USING fts5(
+        path, content,
+        content='',
+        tokenize="unicode61 remove_diacritics 0 tokenchars '_'"
+    );
+    CREATE TRIGGER IF NOT EXISTS project_files_fts_insert AFTER INSERT ON project_files BEGIN
+        INSERT INTO project_files_fts (rowid, path, content)
+        SELECT new.id, new.path, blob_text(codec, data) FROM blobs WHERE hash = new.content_hash;
+    END;
+    CREATE TRIGGER IF NOT EXISTS project_files_fts_delete AFTER DELETE ON project_files BEGIN
+        INSERT INTO project_files_fts (project_files_fts, rowid, path, content)
+        SELECT 'delete', old.id, old.path, blob_text(codec, data) FROM blobs WHERE hash = old.content_hash;
+    END;
+    CREATE TRIGGER IF NOT EXISTS project_files_fts_update AFTER UPDATE OF content_hash ON project_files BEGIN
+        INSERT INTO project_files_fts (project_files_fts, rowid, path, content)
+        SELECT 'delete', old.id, old.path, blob_text(codec, data) FROM blobs WHERE hash = old.content_hash;
+        INSERT INTO project_files_fts (rowid, path, content)
+        SELECT new.id, new.path, blob_text(codec, data) FROM blobs WHERE hash = new.content_hash;
+    END;
+"""
+
+# Trigram posting lists (case-insensitive) used to narrow literal and regex searches
+# to candidate files. detail=none stores only the file ids per trigram, which keeps
+# it a fraction of the content size; the real match is always re-checked.
+# Trigram tokenizing is much slower than reading files, so new rows are not indexed
+# by a trigger but by WorkTree.build_trigram_index, which advances trigram_upto.
+# Rows above that watermark are simply always treated as search candidates.
+# The symbol tables are caught up the same way, see build_symbol_index.
+TRIGRAM_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS project_files_trigram USING fts5(
+        content,
+        content='',
+        tokenize='trigram', detail=none
+    );
+    CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    INSERT OR IGNORE INTO index_state (key, value) VALUES ('trigram_upto', 0);
+    CREATE TRIGGER IF NOT EXISTS project_files_trigram_delete AFTER DELETE ON project_files
+    WHEN old.id <= (SELECT value FROM index_state WHERE key = 'trigram_upto') BEGIN
+        INSERT INTO project_files_trigram (project_files_trigram, rowid, content)
+        SELECT 'delete', old.id, blob_text(codec, data) FROM blobs WHERE hash = old.content_hash;
+    END;
+    CREATE TRIGGER IF NOT EXISTS project_files_trigram_update AFTER UPDATE OF content_hash ON project_files
+    WHEN old.id <= (SELECT value FROM index_state WHERE key = 'trigram_upto') BEGIN
+        INSERT INTO project_files_trigram (project_files_trigram, rowid, content)
+        SELECT 'delete', old.id, blob_text(codec, data) FROM blobs WHERE hash = old.content_hash;
+        INSERT INTO project_files_trigram (rowid, content)
+        SELECT new.id, blob_text(codec, data) FROM blobs WHERE hash = new.content_hash;
+    END;
+"""
+
+# Rows processed per locked step when catching up the trigram and symbol indexes
+DERIVED_INDEX_BATCH = 200
+
+# WAL lets readers keep going while the single writer batches inserts, and with
+# synchronous=NORMAL a commit no longer waits on fsync (only checkpoints do).
+DB_PRAGMAS = """
+    PRAGMA journal_mode = WAL;
+    PRAGMA synchronous = NORMAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA cache_size = -65536;
+    PRAGMA mmap_size = 268435456;
+"""
+
+UPSERT_FILE_SQL = """
+    INSERT INTO project_files (path, last_modified, size, mtime, content_hash)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET
+        last_modified = excluded.last_modified,
+        size = excluded.size,
+        mtime = excluded.mtime,
+        content_hash = excluded.content_hash
+"""
+
+# Blobs must be inserted before the rows pointing at them, the FTS triggers read them.
+INSERT_BLOB_SQL = "INSERT OR IGNORE INTO blobs (hash, codec, size, lines, data) VALUES (?, ?, ?, ?, ?)"
+
+# Bodies no file points at anymore, run after rows were changed or removed
+DELETE_UNUSED_BLOBS_SQL = """
+    DELETE FROM blobs WHERE NOT EXISTS (
+        SELECT 1 FROM project_files WHERE project_files.content_hash = blobs.hash
+    )
+"""
+DELETE_UNUSED_BLOB_SQL = """
+    DELETE FROM blobs WHERE hash = ? AND NOT EXISTS (
+        SELECT 1 FROM project_files WHERE content_hash = ?
+    )
 """
 
+# Outcomes of WorkTree._load_file, one per walked file.
+FILE_ADDED = 'added'
+FILE_CHANGED = 'changed'
+FILE_TOUCHED = 'touched'
+FILE_UNCHANGED = 'unchanged'
+
+
+class ReindexReport:
+    """Counts collected while syncing project_files with the working tree."""
+
+    def __init__(self):
+        self.added = 0
+        self.changed = 0
+        self.removed = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    def to_dict(self):
+        return {
+            "added": self.added,
+            "changed": self.changed,
+            "removed": self.removed,
+            "skipped": self.skipped,
+            "elapsed": round(self.elapsed, 3),
+        }
+
+    def __str__(self):
+        return (f"{self.added} added, {self.changed} changed, {self.removed} removed, "
+                f"{self.skipped} unchanged in {self.elapsed:.2f}s")
+
+
+class FileRange:
+    """A slice of an indexed file, as returned by WorkTree.read_file_range.
+
+    start_line/end_line are 1-based and inclusive, end_line is start_line - 1
+    when nothing was returned. truncated is set when max_bytes cut the slice
+    short of the requested end; cut_line when even a single line was too long.
+    """
+
+    def __init__(self, path, start_line, total_lines, size):
+        self.path = path
+        self.start_line = start_line
+        self.end_line = start_line - 1
+        self.total_lines = total_lines
+        self.size = size
+        self.text = ''
+        self.truncated = False
+        self.cut_line = False
+
+    @property
+    def complete(self):
+        return self.start_line <= 1 and self.end_line >= self.total_lines and not self.cut_line
+
 
 class WorkTree:
     def __init__(self, ctx):
         self.ctx = ctx
         # Assign class attribute to instance for clarity if needed or use WorkTree.DB_SCHEMA
         self.DB_SCHEMA = DB_SCHEMA
+        # The connection is shared with the background watcher, writes go through this lock.
+        self.lock = threading.RLock()
+        self.watcher = None
+        self._index_builder = None
 
         # all ran on init
         self.set_project_index_file_path_name('project_index.db')
-        self.add_git_ignore_files()
+        self.ignore_matcher = IgnoreMatcher(self.ctx.cwd, self.ctx.ignored_files)
         self._init_db()
-        self.save_project_db()
+        self.reindex_report = self.save_project_db(
+            full=getattr(self.ctx, 'full_reindex', False))
 
     def set_project_index_file_path_name(self, name):
         base_dir = '/tmp'
@@ -34,49 +232,394 @@ class WorkTree:
         file_path = os.path.join(directory, name)
         return [directory, file_path]
 
-    def add_git_ignore_files(self):
-        if not hasattr(self.ctx, 'ignored_files') or not isinstance(self.ctx.ignored_files, list):
-            self.ctx.ignored_files = []
-        ignored_patterns = get_git_ignore_file_content(self.ctx.cwd)
-        if ignored_patterns:
-            self.ctx.ignored_files.extend(ignored_patterns)
-
     def _init_db(self):
         # Ensure the directory for the database file exists
         directory, file_path = self.set_project_index_file_path_name(
             'project_index.db')
         os.makedirs(directory, exist_ok=True)
         # Connect to the database FILE
-        self.conn = sqlite3.connect(file_path)
+        self.conn = sqlite3.connect(file_path, check_same_thread=False)
+        self.conn.create_function('blob_text', 2, decompress_text, deterministic=True)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != DB_SCHEMA_VERSION:
+            # Stale layout: throw the whole file away (tables, FTS shadow tables, WAL).
+            self.conn.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(file_path + suffix):
+                    os.remove(file_path + suffix)
+            self.conn = sqlite3.connect(file_path, check_same_thread=False)
+            self.conn.create_function('blob_text', 2, decompress_text, deterministic=True)
         cursor = self.conn.cursor()
+        cursor.executescript(DB_PRAGMAS)
         cursor.executescript(self.DB_SCHEMA)  # or WorkTree.DB_SCHEMA
+        try:
+            cursor.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5, searches fall back to scanning
+            self.has_fts = False
+        try:
+            cursor.executescript(TRIGRAM_SCHEMA)
+            self.has_trigrams = True
+        except sqlite3.OperationalError:
+            # The trigram tokenizer needs SQLite 3.34+
+            self.has_trigrams = False
+        cursor.execute(f"PRAGMA user_version = {DB_SCHEMA_VERSION}")
         self.conn.commit()
 
-    def walk_files(self, start_dir, ignored_files=[]):
-        for dirpath, _, filenames in os.walk(start_dir):
-            if any(ignored in dirpath for ignored in ignored_files if ignored):
-                continue
+    def start_watching(self):
+        """Keep the index in sync with edits made outside of the tools."""
+        from geminicode.work_tree.watcher import create_watcher
+        if self.watcher is None:
+            self.watcher = create_watcher(self)
+            self.watcher.start()
+        return self.watcher
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    def should_index(self, file_path):
+        """Same filtering as walk_files, for a single path reported by the watcher."""
+        return not is_binary_path(file_path) and not self.ignore_matcher.is_ignored(file_path, False)
+
+    def walk_files(self, start_dir):
+        """Yield indexable files below start_dir, never entering ignored directories."""
+        for dirpath, _, filenames in self.ignore_matcher.walk(start_dir):
             for filename in filenames:
-                if any(ignored == filename for ignored in ignored_files if ignored):
-                    continue
-                if '.' not in filename:
-                    continue
-                yield os.path.join(dirpath, filename)
+                if not is_binary_path(filename):
+                    yield os.path.join(dirpath, filename)
 
     def save_to_db(self, file_path, content):
-        self.conn.execute("INSERT INTO project_files (path, content, last_modified) VALUES (?, ?, ?)",
-                          (file_path, content, time.time()))
-        self.conn.commit()
+        """Insert or update a single file row, e.g. after a tool wrote the file."""
+        try:
+            stat = os.stat(file_path)
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            size, mtime = len(content.encode('utf-8')), time.time()
+        content_hash = hash_content(content)
+        blob = compress_text(content)
+        with self.lock:
+            previous = self.conn.execute(
+                "SELECT content_hash FROM project_files WHERE path = ?", (file_path,)).fetchone()
+            self.conn.execute(INSERT_BLOB_SQL, (content_hash, *blob))
+            self.conn.execute(UPSERT_FILE_SQL, (file_path, time.time(), size, mtime, content_hash))
+            if previous and previous[0] != content_hash:
+                self.conn.execute(DELETE_UNUSED_BLOB_SQL, (previous[0], previous[0]))
+            self.conn.commit()
+        self.update_derived_indexes()
+
+    def get_file_content(self, file_path):
+        """Decompressed content of an indexed file, or None if it is not in the index."""
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT b.codec, b.data FROM project_files p
+                JOIN blobs b ON b.hash = p.content_hash
+                WHERE p.path = ?
+            """, (file_path,)).fetchone()
+        if row is None:
+            return None
+        return decompress_text(*row)
+
+    def read_file_range(self, file_path, start_line=1, end_line=None, max_bytes=None):
+        """Lines start_line..end_line of an indexed file, at most max_bytes of them.
+
+        The blob is decompressed as a stream and reading stops at the last line
+        needed, so a slice near the top of a huge file never inflates the rest.
+        Returns None if the file is not in the index.
+        """
+        with self.lock:
+            row = self.conn.execute("""
+                SELECT b.codec, b.size, b.lines, b.data FROM project_files p
+                JOIN blobs b ON b.hash = p.content_hash
+                WHERE p.path = ?
+            """, (file_path,)).fetchone()
+        if row is None:
+            return None
+        codec, size, total_lines, data = row
+        start_line = max(1, start_line)
+        end_line = total_lines if end_line is None else min(end_line, total_lines)
+        result = FileRange(file_path, start_line, total_lines, size)
+        if start_line > end_line:
+            return result
+
+        parts, used = [], 0
+        for line_number, line in enumerate(iter_lines(codec, data), 1):
+            if line_number < start_line:
+                continue
+            if line_number > end_line:
+                break
+            line_bytes = len(line.encode('utf-8'))
+            if max_bytes is not None and used + line_bytes > max_bytes:
+                result.truncated = True
+                if not parts:
+                    # A single overlong line (minified code, data), return its head
+                    parts.append(line.encode('utf-8')[:max_bytes].decode('utf-8', 'ignore'))
+                    result.end_line = line_number
+                    result.cut_line = True
+                break
+            parts.append(line)
+            used += line_bytes
+            result.end_line = line_number
+        result.text = ''.join(parts)
+        return result
+
+    def _load_file(self, file_path, known, full):
+        """Stat, read, hash and compress one file. Runs on the reader pool, never touches the DB.
+
+        Returns a (status, path, row) tuple where row holds the parameters for the
+        statement the writer has to run, or None if the file can't be indexed.
+        New content comes with its blob as ((blob params), (file row params)).
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        row = known.get(file_path)
+        if row and not full and row[0] == stat.st_size and row[1] == stat.st_mtime:
+            return FILE_UNCHANGED, file_path, None
+
+        content = read_text_file(file_path)
+        if content is None:
+            return None
+        content_hash = hash_content(content)
+        if row and row[2] == content_hash:
+            # Touched but identical, only refresh the metadata used to skip it next time.
+            return FILE_TOUCHED, file_path, (stat.st_size, stat.st_mtime, file_path)
+
+        status = FILE_CHANGED if row else FILE_ADDED
+        blob = (content_hash, *compress_text(content))
+        return status, file_path, (blob, (file_path, time.time(), stat.st_size, stat.st_mtime, content_hash))
+
+    def _collect_load_result(self, result, report, upserts, touched):
+        status, _, row = result
+        if status == FILE_UNCHANGED:
+            report.skipped += 1
+        elif status == FILE_TOUCHED:
+            report.skipped += 1
+            touched.append(row)
+        else:
+            upserts.append(row)
+            if status == FILE_CHANGED:
+                report.changed += 1
+            else:
+                report.added += 1
+
+    def _write_batch(self, upserts, touched):
+        if upserts:
+            self.conn.executemany(INSERT_BLOB_SQL, [blob for blob, _ in upserts])
+            self.conn.executemany(UPSERT_FILE_SQL, [row for _, row in upserts])
+            upserts.clear()
+        if touched:
+            self.conn.executemany(
+                "UPDATE project_files SET size = ?, mtime = ? WHERE path = ?", touched)
+            touched.clear()
+
+    def save_project_db(self, full=False):
+        """Sync project_files with the working tree.
+
+        Files whose size and mtime match the stored row are skipped without being
+        read. Files that did change are re-read and only rewritten when their
+        content hash differs, and rows for files that are gone are deleted.
+        Pass full=True to re-read every file regardless of its metadata.
+
+        Reading, decoding and hashing happen on a thread pool while this thread
+        is the only writer, flushing rows with executemany inside one transaction.
+        The work tree lock is held for the whole transaction.
+
+        Returns:
+            ReindexReport: added/changed/removed/skipped counts and elapsed time.
+        """
+        start = time.perf_counter()
+        report = ReindexReport()
+        # The connection is shared, so the lock is held until the commit: another
+        # thread's commit() would otherwise commit a half-finished rescan.
+        with self.lock:
+            known = {
+                path: (size, mtime, content_hash)
+                for path, size, mtime, content_hash in self.conn.execute(
+                    "SELECT path, size, mtime, content_hash FROM project_files")
+            }
+            seen = set()
+            upserts, touched = [], []
+
+            paths = self.walk_files(self.ctx.cwd)
+            with ThreadPoolExecutor(max_workers=INDEX_READ_WORKERS) as pool:
+                # Submit in windows so a huge tree never has every file body in memory at once.
+                while True:
+                    window = [path for _, path in zip(range(INDEX_WRITE_BATCH_SIZE), paths)]
+                    if not window:
+                        break
+                    results = list(pool.map(lambda path: self._load_file(path, known, full), window))
+                    for result in results:
+                        if result is None:
+                            continue
+                        seen.add(result[1])
+                        self._collect_load_result(result, report, upserts, touched)
+                    self._write_batch(upserts, touched)
 
-    def save_project_db(self):
-        for file_path in self.walk_files(self.ctx.cwd, self.ctx.ignored_files):
-            content = read_file(file_path)
-            if content != None:
+            removed = [(path,) for path in known if path not in seen]
+            if removed:
+                self.conn.executemany("DELETE FROM project_files WHERE path = ?", removed)
+                report.removed = len(removed)
+            if report.changed or report.removed:
+                self.conn.execute(DELETE_UNUSED_BLOBS_SQL)
+
+            self.conn.commit()  # Commit all changes after the loop
+        self.update_derived_indexes()
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def apply_changes(self, paths):
+        """Re-sync only the given paths, as reported by the watcher.
+
+        A path can be a file or a directory. Files that still exist are
+        re-indexed if their metadata changed, directories are walked, and
+        anything that no longer exists is removed together with the rows below it.
+
+        Returns:
+            ReindexReport: counts for this batch.
+        """
+        start = time.perf_counter()
+        report = ReindexReport()
+        files, gone = set(), []
+        if any(os.path.basename(path) == '.gitignore' for path in paths):
+            self.ignore_matcher.reload()
+        for path in paths:
+            if os.path.isdir(path):
+                files.update(self.walk_files(path))
+            elif os.path.isfile(path):
+                if self.should_index(path):
+                    files.add(path)
+            else:
+                gone.append(path)
+
+        with self.lock:
+            known = {}
+            for file_path in files:
+                row = self.conn.execute(
+                    "SELECT size, mtime, content_hash FROM project_files WHERE path = ?",
+                    (file_path,)).fetchone()
+                if row:
+                    known[file_path] = row
+
+            upserts, touched = [], []
+            for file_path in files:
+                result = self._load_file(file_path, known, False)
+                if result is not None:
+                    self._collect_load_result(result, report, upserts, touched)
+            self._write_batch(upserts, touched)
+
+            for path in gone:
+                cursor = self.conn.execute(
+                    "DELETE FROM project_files WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                    (path, _like_escape(path.rstrip(os.sep) + os.sep) + '%'))
+                report.removed += cursor.rowcount
+            if report.changed or report.removed:
+                self.conn.execute(DELETE_UNUSED_BLOBS_SQL)
+            self.conn.commit()
+        self.update_derived_indexes()
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def trigram_upto(self):
+        """Highest project_files id covered by the trigram index, newer rows are unindexed."""
+        if not self.has_trigrams:
+            return None
+        with self.lock:
+            return self.conn.execute(
+                "SELECT value FROM index_state WHERE key = 'trigram_upto'").fetchone()[0]
+
+    def build_trigram_index(self):
+        """Trigram-index every row above the watermark, one short locked batch at a time."""
+        while True:
+            with self.lock:
+                upto = self.trigram_upto()
+                rows = self.conn.execute("""
+                    SELECT p.id, b.codec, b.data FROM project_files p
+                    JOIN blobs b ON b.hash = p.content_hash
+                    WHERE p.id > ? ORDER BY p.id LIMIT ?
+                """, (upto, DERIVED_INDEX_BATCH)).fetchall()
+                if not rows:
+                    return
+                self.conn.executemany(
+                    "INSERT INTO project_files_trigram (rowid, content) VALUES (?, ?)",
+                    [(file_id, decompress_text(codec, data)) for file_id, codec, data in rows])
+                self.conn.execute("UPDATE index_state SET value = ? WHERE key = 'trigram_upto'",
+                                  (rows[-1][0],))
+                self.conn.commit()
+
+    def build_symbol_index(self):
+        """Extract definitions/references for rows whose content changed since the last extraction.
+
+        Parsing happens outside the lock; a row that changed again meanwhile is
+        left pending for the next round.
+        """
+        while True:
+            with self.lock:
+                rows = self.conn.execute("""
+                    SELECT p.id, p.path, b.codec, b.data, p.content_hash FROM project_files p
+                    JOIN blobs b ON b.hash = p.content_hash
+                    WHERE p.symbols_hash != p.content_hash LIMIT ?
+                """, (DERIVED_INDEX_BATCH,)).fetchall()
+            if not rows:
+                return
+            extracted = []
+            for file_id, file_path, codec, data, content_hash in rows:
                 try:
-                    self.save_to_db(file_path, content)
-                except sqlite3.IntegrityError:
-                    print(f"Path {
-                          file_path} already exists or another integrity error occurred. Updating instead.")
-                    self.conn.execute("UPDATE project_files SET content = ?, last_modified = ? WHERE path = ?",
-                                      (content, time.time(), file_path))
-        self.conn.commit()  # Commit all changes after the loop
+                    definitions, references = extract_symbols(file_path, decompress_text(codec, data))
+                except Exception:
+                    definitions, references = [], []
+                extracted.append((file_id, content_hash, definitions, references))
+
+            with self.lock:
+                for file_id, content_hash, definitions, references in extracted:
+                    current = self.conn.execute(
+                        "SELECT content_hash FROM project_files WHERE id = ?", (file_id,)).fetchone()
+                    if current is None or current[0] != content_hash:
+                        continue
+                    self.conn.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+                    self.conn.execute("DELETE FROM symbol_refs WHERE file_id = ?", (file_id,))
+                    self.conn.executemany(
+                        "INSERT INTO symbols (file_id, name, kind, line, container) VALUES (?, ?, ?, ?, ?)",
+                        [(file_id, *definition) for definition in definitions])
+                    self.conn.executemany(
+                        "INSERT INTO symbol_refs (file_id, name, line) VALUES (?, ?, ?)",
+                        [(file_id, *reference) for reference in references])
+                    self.conn.execute("UPDATE project_files SET symbols_hash = ? WHERE id = ?",
+                                      (content_hash, file_id))
+                self.conn.commit()
+
+    def pending_index_rows(self):
+        """Rows the trigram and symbol indexes have not caught up with yet."""
+        with self.lock:
+            pending = self.conn.execute(
+                "SELECT count(*) FROM project_files WHERE symbols_hash != content_hash").fetchone()[0]
+            if self.has_trigrams:
+                pending += self.conn.execute("SELECT count(*) FROM project_files WHERE id > ?",
+                                             (self.trigram_upto(),)).fetchone()[0]
+        return pending
+
+    def _build_derived_indexes(self):
+        if self.has_trigrams:
+            self.build_trigram_index()
+        self.build_symbol_index()
+
+    def update_derived_indexes(self):
+        """Catch the trigram and symbol indexes up: inline for a few rows, on a background thread for bulk loads."""
+        if self._index_builder is not None and self._index_builder.is_alive():
+            return
+        pending = self.pending_index_rows()
+        if pending == 0:
+            return
+        if pending <= DERIVED_INDEX_BATCH:
+            self._build_derived_indexes()
+            return
+        self._index_builder = threading.Thread(
+            target=self._build_derived_indexes, name="index-builder", daemon=True)
+        self._index_builder.start()
+
+
+def _like_escape(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -0,0 +1,99 @@
+"""Turn literals and regexes into trigram queries for the project_files_trigram index.
+
+A regex is reduced to the literal strings any match must contain (the Google
+Code Search / Zoekt approach): concatenated literals must all appear, each
+branch of an alternation contributes an OR, and anything that can match
+arbitrary text (classes, optional repeats, backreferences) adds no constraint.
+The resulting query only narrows candidates, the real regex still decides.
+"""
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# Long literals only need a handful of trigrams to be selective
+MAX_TRIGRAMS_PER_LITERAL = 24
+
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, 'POSSESSIVE_REPEAT'):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+
+def _quote(trigram):
+    return '"' + trigram.replace('"', '""') + '"'
+
+
+def literal_trigram_query(literal):
+    """FTS query requiring every trigram of `literal`, or None if it is shorter than 3 chars."""
+    trigrams = list(dict.fromkeys(literal[i:i + 3] for i in range(len(literal) - 2)))
+    if not trigrams:
+        return None
+    if len(trigrams) > MAX_TRIGRAMS_PER_LITERAL:
+        step = len(trigrams) / MAX_TRIGRAMS_PER_LITERAL
+        trigrams = [trigrams[int(i * step)] for i in range(MAX_TRIGRAMS_PER_LITERAL)]
+    return ' AND '.join(_quote(trigram) for trigram in trigrams)
+
+
+def _and(parts):
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else ('and', parts)
+
+
+def _analyze(items):
+    """Required-literal query for a parsed sequence, None meaning "matches anything"."""
+    parts = []
+    run = []
+
+    def flush():
+        if len(run) >= 3:
+            parts.append(('lit', ''.join(run)))
+        run.clear()
+
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            run.append(chr(av))
+        elif op == sre_constants.AT:
+            # Anchors are zero-width, the literals around them stay adjacent
+            continue
+        elif op == sre_constants.IN and len(av) == 1 and av[0][0] == sre_constants.LITERAL:
+            run.append(chr(av[0][1]))
+        elif op == sre_constants.SUBPATTERN:
+            flush()
+            parts.append(_analyze(av[-1]))
+        elif op in _REPEATS:
+            flush()
+            low, _, body = av
+            if low >= 1:
+                parts.append(_analyze(body))
+        elif op == sre_constants.BRANCH:
+            flush()
+            branches = [_analyze(branch) for branch in av[1]]
+            if all(branch is not None for branch in branches):
+                parts.append(('or', branches))
+        else:
+            flush()
+    flush()
+    return _and(parts)
+
+
+def _to_fts(query):
+    kind, value = query
+    if kind == 'lit':
+        return '(' + literal_trigram_query(value) + ')'
+    joiner = ' AND ' if kind == 'and' else ' OR '
+    return '(' + joiner.join(_to_fts(part) for part in value) + ')'
+
+
+def regex_trigram_query(expression):
+    """FTS query narrowing the files a regex can match, or None when every file is a candidate.
+
+    Raises re.error for invalid patterns.
+    """
+    query = _analyze(sre_parse.parse(expression))
+    if query is None:
+        return None
+    return _to_fts(query)
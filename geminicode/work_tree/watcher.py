@@ -0,0 +1,240 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from geminicode.config import WATCHER_DEBOUNCE_SECONDS, WATCHER_MAX_BATCH, WATCHER_POLL_INTERVAL
+from geminicode.utils.logger import logger
+
+# inotify(7) event masks
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct('iIII')
+
+# Queued instead of a path when the kernel dropped events and only a rescan is safe.
+RESCAN = object()
+
+
+class IndexUpdateQueue:
+    """Debounces and coalesces changed paths, then applies them to the index in batches.
+
+    Every event for a path just refreshes its timestamp, so a burst of writes to
+    one file (editor save, codegen) turns into a single re-index once the path
+    has been quiet for `debounce` seconds.
+    """
+
+    def __init__(self, work_tree, debounce=WATCHER_DEBOUNCE_SECONDS, max_batch=WATCHER_MAX_BATCH):
+        self.work_tree = work_tree
+        self.debounce = debounce
+        self.max_batch = max_batch
+        self._pending = {}
+        self._rescan = False
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="index-update-queue", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def put(self, path):
+        with self._cond:
+            if path is RESCAN:
+                self._rescan = True
+            else:
+                self._pending[path] = time.monotonic()
+            self._cond.notify()
+
+    def _take_ready(self):
+        """Wait for quiet paths, return (rescan, paths) or None once stopped."""
+        with self._cond:
+            while not self._stopped:
+                if self._rescan:
+                    self._rescan = False
+                    self._pending.clear()
+                    return True, []
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                ready = [path for path, seen in self._pending.items() if now - seen >= self.debounce]
+                if ready:
+                    batch = ready[:self.max_batch]
+                    for path in batch:
+                        del self._pending[path]
+                    return False, batch
+                # Wake when the path that went quiet first is ready
+                oldest = min(self._pending.values())
+                self._cond.wait(self.debounce - (now - oldest))
+            return None
+
+    def _run(self):
+        while True:
+            ready = self._take_ready()
+            if ready is None:
+                return
+            rescan, paths = ready
+            try:
+                if rescan:
+                    report = self.work_tree.save_project_db()
+                else:
+                    report = self.work_tree.apply_changes(paths)
+                logger.debug(f"Index update: {report}")
+            except Exception as e:
+                logger.error(f"Failed to apply index updates: {e}", exc_info=True)
+
+
+class InotifyWatcher:
+    """Recursive inotify watch on the project, feeding an IndexUpdateQueue."""
+
+    def __init__(self, work_tree, queue):
+        self.work_tree = work_tree
+        self.queue = queue
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wd_to_dir = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inotify-watcher", daemon=True)
+        try:
+            self._add_tree(work_tree.ctx.cwd)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self._wd_to_dir[wd] = directory
+
+    def _add_tree(self, root):
+        for dirpath, _, _ in self.work_tree.ignore_matcher.walk(root):
+            self._add_watch(dirpath)
+
+    def start(self):
+        self.queue.start()
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        os.close(self._fd)
+        self.queue.stop()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            readable, _, _ = select.select([self._fd], [], [], 0.5)
+            if not readable:
+                continue
+            try:
+                buffer = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            self._handle_events(buffer)
+
+    def _handle_events(self, buffer):
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + name_len].split(b'\0', 1)[0])
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                self.queue.put(RESCAN)
+                continue
+            directory = self._wd_to_dir.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._wd_to_dir[wd]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self.queue.put(directory)
+                continue
+
+            path = os.path.join(directory, name) if name else directory
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    self._add_tree(path)
+                except OSError as e:
+                    logger.warning(f"Could not watch new directory {path}: {e}")
+            self.queue.put(path)
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify: rescans size/mtime on an interval."""
+
+    def __init__(self, work_tree, queue, interval=WATCHER_POLL_INTERVAL):
+        self.work_tree = work_tree
+        self.queue = queue
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="polling-watcher", daemon=True)
+
+    def _scan(self):
+        snapshot = {}
+        for file_path in self.work_tree.walk_files(self.work_tree.ctx.cwd):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            snapshot[file_path] = (stat.st_size, stat.st_mtime)
+        return snapshot
+
+    def start(self):
+        self.queue.start()
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        self.queue.stop()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            snapshot = self._scan()
+            for file_path, metadata in snapshot.items():
+                if self._snapshot.get(file_path) != metadata:
+                    self.queue.put(file_path)
+            for file_path in self._snapshot.keys() - snapshot.keys():
+                self.queue.put(file_path)
+            self._snapshot = snapshot
+
+
+def create_watcher(work_tree):
+    """inotify on Linux, polling everywhere else or when inotify is unavailable."""
+    queue = IndexUpdateQueue(work_tree)
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(work_tree, queue)
+        except (OSError, AttributeError) as e:
+            # e.g. fs.inotify.max_user_watches exhausted on very large trees
+            logger.warning(f"inotify unavailable, falling back to polling: {e}")
+    return PollingWatcher(work_tree, queue)